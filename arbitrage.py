@@ -1,6 +1,102 @@
 from typing import List, Dict, Tuple
+from collections import namedtuple
+from itertools import repeat, starmap
+from operator import attrgetter, itemgetter
+import numpy as np
+from numba import njit, prange
 from platforms.base import PlatformClient
 
+# (yes_price, no_price) of a normalized market in a single C-level call
+_get_prices = itemgetter('yes_price', 'no_price')
+
+# Compact per-hit record; expanded into the full opportunity dict on return
+_Hit = namedtuple(
+    '_Hit',
+    'pair_idx direction pm_price kalshi_price total_cost total_cost_with_fees profit profit_pct'
+)
+
+
+# Pair count above which the scenario loop is spread across all cores
+PARALLEL_MIN_PAIRS = 100_000
+
+
+def _compute_arb(pm_yes, pm_no, kalshi_yes, kalshi_no, pm_fee_rate, kalshi_fee_rate, min_profit_pct):
+    """
+    Scenario math over flat price arrays, run in a compiled loop.
+    
+    Returns:
+        (cost_with_fees, profit_pct, hit_mask) for scenario 1 followed by the
+        same three arrays for scenario 2
+    """
+    n = pm_yes.shape[0]
+    # Row 0 holds scenario 1, row 1 scenario 2
+    cost_with_fees = np.zeros((2, n), dtype=np.float64)
+    profit_pct = np.zeros((2, n), dtype=np.float64)
+    hit = np.zeros((2, n), dtype=np.bool_)
+    
+    # With non-negative fees the cost after fees is never below the raw cost,
+    # and a scenario only reaches min_profit_pct when its cost after fees is
+    # at most 1 / (1 + min_profit_pct / 100). A raw cost above that bound rules
+    # the scenario out, so its fee math is skipped (outputs stay zero). For
+    # well-formed binary markets the two raw costs sum to ~2, so at most one
+    # scenario per pair survives this check.
+    prune = min_profit_pct > 0 and pm_fee_rate >= 0 and kalshi_fee_rate >= 0
+    max_cost = 1.0 / (1.0 + min_profit_pct / 100) if prune else 0.0
+    
+    # Loop-invariant fee multipliers
+    pm_mult = 1.0 + pm_fee_rate
+    kalshi_mult = 1.0 + kalshi_fee_rate
+    
+    # Pairs are independent and each iteration writes only its own slots, so
+    # large batches can run the same loop in parallel without races
+    arb_loop = _arb_loop_parallel if n >= PARALLEL_MIN_PAIRS else _arb_loop
+    arb_loop(
+        pm_yes, pm_no, kalshi_yes, kalshi_no, pm_mult, kalshi_mult,
+        prune, max_cost, min_profit_pct, cost_with_fees, profit_pct, hit
+    )
+    
+    return cost_with_fees[0], profit_pct[0], hit[0], cost_with_fees[1], profit_pct[1], hit[1]
+
+
+@njit(fastmath=True, cache=True)
+def _scenario(pm_price, kalshi_price, pm_mult, kalshi_mult, prune, max_cost, min_profit_pct):
+    """(cost_with_fees, profit_pct, hit) for one scenario of one pair."""
+    if prune and pm_price + kalshi_price > max_cost:
+        return 0.0, 0.0, False
+    cost = pm_price * pm_mult + kalshi_price * kalshi_mult
+    pct = (1.0 - cost) / cost * 100 if cost > 0 else 0.0
+    return cost, pct, pct >= min_profit_pct
+
+
+@njit(fastmath=True, cache=True)
+def _arb_loop(pm_yes, pm_no, kalshi_yes, kalshi_no, pm_mult, kalshi_mult,
+              prune, max_cost, min_profit_pct, cost_with_fees, profit_pct, hit):
+    """Serial scenario loop; fills the preallocated output rows in place."""
+    for i in range(pm_yes.shape[0]):
+        # Scenario 1: Buy YES on Polymarket + NO on other platform
+        # Cost = pm_yes + other_no, Payout = 1.0
+        cost_with_fees[0, i], profit_pct[0, i], hit[0, i] = _scenario(
+            pm_yes[i], kalshi_no[i], pm_mult, kalshi_mult, prune, max_cost, min_profit_pct
+        )
+        # Scenario 2: Buy NO on Polymarket + YES on other platform
+        # Cost = pm_no + other_yes, Payout = 1.0
+        cost_with_fees[1, i], profit_pct[1, i], hit[1, i] = _scenario(
+            pm_no[i], kalshi_yes[i], pm_mult, kalshi_mult, prune, max_cost, min_profit_pct
+        )
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _arb_loop_parallel(pm_yes, pm_no, kalshi_yes, kalshi_no, pm_mult, kalshi_mult,
+                       prune, max_cost, min_profit_pct, cost_with_fees, profit_pct, hit):
+    """_arb_loop over prange; kept as a separate function so each variant gets its own cache entry."""
+    for i in prange(pm_yes.shape[0]):
+        cost_with_fees[0, i], profit_pct[0, i], hit[0, i] = _scenario(
+            pm_yes[i], kalshi_no[i], pm_mult, kalshi_mult, prune, max_cost, min_profit_pct
+        )
+        cost_with_fees[1, i], profit_pct[1, i], hit[1, i] = _scenario(
+            pm_no[i], kalshi_yes[i], pm_mult, kalshi_mult, prune, max_cost, min_profit_pct
+        )
+
 
 def find_arbitrage_opportunities(
     matched_events: List[Tuple[Dict, Dict]],
@@ -36,11 +132,13 @@ def find_arbitrage_opportunities(
             'profit_pct': float
         }
     """
-    opportunities = []
-    
-    pm_fee_rate = polymarket_client.get_fee_rate()
-    kalshi_fee_rate = kalshi_client.get_fee_rate()
+    pm_fee_rate = polymarket_client.fee_rate
+    kalshi_fee_rate = kalshi_client.fee_rate
     
+    # Walk the pairs once to pull prices into flat arrays; the scenario math
+    # then runs in the compiled _compute_arb loop instead of the interpreter
+    pairs = []
+    prices = []
     for pm_event, kalshi_event in matched_events:
         # Compare markets between platforms
         # For simplicity, compare first market from each event
@@ -51,64 +149,80 @@ def find_arbitrage_opportunities(
         pm_market = pm_event['markets'][0]
         kalshi_market = kalshi_event['markets'][0]
         
-        pm_yes = pm_market['yes_price']
-        pm_no = pm_market['no_price']
-        kalshi_yes = kalshi_market['yes_price']
-        kalshi_no = kalshi_market['no_price']
-        
-        if None in [pm_yes, pm_no, kalshi_yes, kalshi_no]:
+        row = _get_prices(pm_market) + _get_prices(kalshi_market)
+        if None in row:
             continue
         
-        # Scenario 1: Buy YES on Polymarket + NO on other platform
-        # Cost = pm_yes + other_no, Payout = 1.0
-        cost_scenario1 = pm_yes + kalshi_no
-        cost_with_fees_scenario1 = (
-            pm_yes * (1 + pm_fee_rate) + 
-            kalshi_no * (1 + kalshi_fee_rate)
-        )
-        profit_scenario1 = 1.0 - cost_with_fees_scenario1
-        profit_pct_scenario1 = (profit_scenario1 / cost_with_fees_scenario1 * 100) if cost_with_fees_scenario1 > 0 else 0
-        
-        if profit_pct_scenario1 >= min_profit_pct:
-            opportunities.append({
-                'pm_event': pm_event,
-                'kalshi_event': kalshi_event,
-                'pm_market': pm_market,
-                'kalshi_market': kalshi_market,
-                'direction': 'pm_yes_kalshi_no',
-                'pm_price': pm_yes,
-                'kalshi_price': kalshi_no,
-                'total_cost': cost_scenario1,
-                'total_cost_with_fees': cost_with_fees_scenario1,
-                'payout': 1.0,
-                'profit': profit_scenario1,
-                'profit_pct': profit_pct_scenario1
-            })
-        
-        # Scenario 2: Buy NO on Polymarket + YES on other platform
-        # Cost = pm_no + other_yes, Payout = 1.0
-        cost_scenario2 = pm_no + kalshi_yes
-        cost_with_fees_scenario2 = (
-            pm_no * (1 + pm_fee_rate) + 
-            kalshi_yes * (1 + kalshi_fee_rate)
-        )
-        profit_scenario2 = 1.0 - cost_with_fees_scenario2
-        profit_pct_scenario2 = (profit_scenario2 / cost_with_fees_scenario2 * 100) if cost_with_fees_scenario2 > 0 else 0
-        
-        if profit_pct_scenario2 >= min_profit_pct:
-            opportunities.append({
-                'pm_event': pm_event,
-                'kalshi_event': kalshi_event,
-                'pm_market': pm_market,
-                'kalshi_market': kalshi_market,
-                'direction': 'pm_no_kalshi_yes',
-                'pm_price': pm_no,
-                'kalshi_price': kalshi_yes,
-                'total_cost': cost_scenario2,
-                'total_cost_with_fees': cost_with_fees_scenario2,
-                'payout': 1.0,
-                'profit': profit_scenario2,
-                'profit_pct': profit_pct_scenario2
-            })
+        pairs.append((pm_event, kalshi_event, pm_market, kalshi_market))
+        prices.append(row)
+    
+    if not pairs:
+        return []
+    
+    # Transpose into contiguous per-column rows so the compiled loop reads unit-stride arrays
+    pm_yes, pm_no, kalshi_yes, kalshi_no = np.ascontiguousarray(np.array(prices, dtype=np.float64).T)
+    
+    (
+        cost_with_fees_scenario1, profit_pct_scenario1, hit_scenario1,
+        cost_with_fees_scenario2, profit_pct_scenario2, hit_scenario2
+    ) = _compute_arb(
+        pm_yes, pm_no, kalshi_yes, kalshi_no,
+        pm_fee_rate, kalshi_fee_rate, min_profit_pct
+    )
     
-    return opportunities
+    # Collect hits as compact tuples, then sort back into the original
+    # per-pair order (stable, so scenario 1 stays ahead of scenario 2)
+    hits = _collect_hits(
+        hit_scenario1, 'pm_yes_kalshi_no', pm_yes, kalshi_no,
+        cost_with_fees_scenario1, profit_pct_scenario1
+    ) + _collect_hits(
+        hit_scenario2, 'pm_no_kalshi_yes', pm_no, kalshi_yes,
+        cost_with_fees_scenario2, profit_pct_scenario2
+    )
+    hits.sort(key=attrgetter('pair_idx'))
+    
+    # Materialize the documented dicts only at the boundary
+    return [_build_opportunity(pairs[hit.pair_idx], hit) for hit in hits]
+
+
+def _collect_hits(
+    hit_mask: np.ndarray,
+    direction: str,
+    pm_price: np.ndarray,
+    kalshi_price: np.ndarray,
+    cost_with_fees: np.ndarray,
+    profit_pct: np.ndarray
+) -> List[_Hit]:
+    """Gather one scenario's hits as _Hit tuples of plain Python floats."""
+    idx = hit_mask.nonzero()[0]
+    pm_price, kalshi_price = pm_price[idx], kalshi_price[idx]
+    cost_with_fees = cost_with_fees[idx]
+    return list(starmap(_Hit, zip(
+        idx.tolist(),
+        repeat(direction),
+        pm_price.tolist(),
+        kalshi_price.tolist(),
+        (pm_price + kalshi_price).tolist(),
+        cost_with_fees.tolist(),
+        (1.0 - cost_with_fees).tolist(),
+        profit_pct[idx].tolist()
+    )))
+
+
+def _build_opportunity(pair: Tuple[Dict, Dict, Dict, Dict], hit: _Hit) -> Dict:
+    """Build the opportunity dict documented in find_arbitrage_opportunities."""
+    pm_event, kalshi_event, pm_market, kalshi_market = pair
+    return {
+        'pm_event': pm_event,
+        'kalshi_event': kalshi_event,
+        'pm_market': pm_market,
+        'kalshi_market': kalshi_market,
+        'direction': hit.direction,
+        'pm_price': hit.pm_price,
+        'kalshi_price': hit.kalshi_price,
+        'total_cost': hit.total_cost,
+        'total_cost_with_fees': hit.total_cost_with_fees,
+        'payout': 1.0,
+        'profit': hit.profit,
+        'profit_pct': hit.profit_pct
+    }
@@ -57,6 +57,40 @@ def format_timestamp(iso_str: str) -> str:
     except:
         return iso_str
 
+def stats_mtime_ns() -> int:
+    """Modification time of the stats file, or 0 if it does not exist yet."""
+    try:
+        return STATS_FILE.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+@st.cache_data(ttl=5, show_spinner=False)
+def load_stats(mtime_ns: int):
+    """Load stats from file; cached per file mtime so widget reruns skip the parse."""
+    return get_stats()
+
+@st.cache_data(ttl=5, show_spinner=False)
+def load_history_chart(mtime_ns: int):
+    """Build the scan history trend DataFrame; cached per stats file mtime."""
+    import pandas as pd
+    
+    scan_history = (load_stats(mtime_ns) or {}).get('scan_history', [])
+    
+    df = pd.DataFrame(scan_history)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df = df.sort_values('timestamp')
+    
+    # Handle both 'opportunities' (list) and 'opportunities_count' (number) in history
+    if 'opportunities_count' in df.columns:
+        opp_col = 'opportunities_count'
+    else:
+        # Convert opportunities list to count if needed
+        df['opportunities_count'] = df['opportunities'].apply(lambda x: len(x) if isinstance(x, list) else (x if isinstance(x, (int, float)) else 0))
+        opp_col = 'opportunities_count'
+    
+    chart_data = df[['timestamp', 'pm_events', 'manifold_events', 'matched', opp_col]].set_index('timestamp')
+    return chart_data.rename(columns={opp_col: 'opportunities'})
+
 @st.cache_data(ttl=60)  # Cache for 60 seconds
 def perform_live_scan():
     """Perform a live scan when JSON file is not available (e.g., on Streamlit Cloud)."""
@@ -72,9 +106,23 @@ def perform_live_scan():
         
         # Fetch events
         async def fetch_events():
-            pm_events = await pm_client.get_events(limit=50, max_resolution_days=3)
-            manifold_events = await manifold_client.get_events(limit=50, max_resolution_days=3)
-            return pm_events, manifold_events
+            try:
+                # Both platforms in parallel; the live scan needs both, so one failing cancels the other
+                if hasattr(asyncio, 'TaskGroup'):
+                    async with asyncio.TaskGroup() as tg:
+                        pm_task = tg.create_task(pm_client.get_events(limit=50, max_resolution_days=3))
+                        manifold_task = tg.create_task(manifold_client.get_events(limit=50, max_resolution_days=3))
+                    return pm_task.result(), manifold_task.result()
+                # Python < 3.11
+                pm_events, manifold_events = await asyncio.gather(
+                    pm_client.get_events(limit=50, max_resolution_days=3),
+                    manifold_client.get_events(limit=50, max_resolution_days=3)
+                )
+                return pm_events, manifold_events
+            finally:
+                # Sessions are bound to this asyncio.run() loop
+                await pm_client.close()
+                await manifold_client.close()
         
         pm_events, manifold_events = asyncio.run(fetch_events())
         
@@ -189,7 +237,8 @@ def main():
         st.rerun()
     
     # Load stats - try JSON file first, then perform live scan
-    stats = get_stats()
+    mtime_ns = stats_mtime_ns()
+    stats = load_stats(mtime_ns)
     
     if not stats:
         # If no JSON file exists (e.g., on Streamlit Cloud), perform live scan
@@ -302,12 +351,13 @@ def main():
                 st.info("No opportunities found yet")
         
         with col3:
-            # Calculate averages
+            # Averages from the running aggregates kept by stats_writer
             scan_history = stats.get('scan_history', [])
-            if scan_history:
-                avg_pm = sum(s.get('pm_events', 0) for s in scan_history) / len(scan_history)
-                avg_mf = sum(s.get('manifold_events', 0) for s in scan_history) / len(scan_history)
-                avg_matched = sum(s.get('matched', 0) for s in scan_history) / len(scan_history)
+            agg = stats.get('agg')
+            if agg and agg.get('n'):
+                avg_pm = agg['sum_pm'] / agg['n']
+                avg_mf = agg['sum_mf'] / agg['n']
+                avg_matched = agg['sum_matched'] / agg['n']
                 
                 st.metric("Avg PM Events", f"{avg_pm:.1f}")
                 st.metric("Avg Manifold Events", f"{avg_mf:.1f}")
@@ -317,22 +367,7 @@ def main():
         if len(scan_history) > 1:
             st.subheader("Scan History Trends")
             
-            import pandas as pd
-            
-            df = pd.DataFrame(scan_history)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df = df.sort_values('timestamp')
-            
-            # Handle both 'opportunities' (list) and 'opportunities_count' (number) in history
-            if 'opportunities_count' in df.columns:
-                opp_col = 'opportunities_count'
-            else:
-                # Convert opportunities list to count if needed
-                df['opportunities_count'] = df['opportunities'].apply(lambda x: len(x) if isinstance(x, list) else (x if isinstance(x, (int, float)) else 0))
-                opp_col = 'opportunities_count'
-            
-            chart_data = df[['timestamp', 'pm_events', 'manifold_events', 'matched', opp_col]].set_index('timestamp')
-            chart_data = chart_data.rename(columns={opp_col: 'opportunities'})
+            chart_data = load_history_chart(mtime_ns)
             st.line_chart(chart_data)
     
     with tab3:
@@ -1,16 +1,137 @@
 from typing import List, Dict, Tuple
-from datetime import timedelta
+from functools import lru_cache
 from difflib import SequenceMatcher
+import numpy as np
+
+try:
+    from rapidfuzz import fuzz, process
+except ImportError:  # rapidfuzz not installed: fall back to matcher_impl, then difflib
+    fuzz = process = None
+
+_c_ratio = None
+if fuzz is None:
+    try:
+        from matcher_impl import ratio as _c_ratio
+    except ImportError:
+        try:
+            # Compile matcher_impl.pyx on the fly if Cython is available
+            import pyximport
+            pyximport.install(language_level=3)
+            from matcher_impl import ratio as _c_ratio
+        except Exception:
+            _c_ratio = None
+
+# rapidfuzz and matcher_impl score (a, b) and (b, a) alike; difflib's autojunk
+# heuristic depends on which title is seq2, so its pairs keep their order
+_SYMMETRIC = fuzz is not None or _c_ratio is not None
 
 
 def calculate_title_similarity(title1: str, title2: str) -> float:
     """
-    Calculate similarity between two titles using SequenceMatcher.
+    Calculate similarity between two titles using RapidFuzz (matcher_impl or difflib fallback).
+    
+    Results are memoized, since the same pairs recur scan after scan.
     
     Returns:
         Similarity score between 0.0 and 1.0
     """
-    return SequenceMatcher(None, title1.lower(), title2.lower()).ratio()
+    return _cached_ratio(title1.lower(), title2.lower())
+
+
+def _cached_ratio(title1: str, title2: str) -> float:
+    """Memoized similarity of two already-lowercased titles."""
+    # Symmetric scorers share one cache entry per unordered pair
+    if _SYMMETRIC and title1 > title2:
+        title1, title2 = title2, title1
+    return _sim_cached(title1, title2)
+
+
+@lru_cache(maxsize=1 << 16)
+def _sim_cached(title1: str, title2: str) -> float:
+    """Memoized _ratio; inspect with _sim_cached.cache_info()."""
+    return _ratio(title1, title2)
+
+
+def _ratio(title1: str, title2: str) -> float:
+    """Similarity of two already-lowercased titles."""
+    if fuzz is not None:
+        return fuzz.ratio(title1, title2) / 100.0
+    if _c_ratio is not None:
+        return _c_ratio(title1, title2)
+    return SequenceMatcher(None, title1, title2).ratio()
+
+
+def _similarity_matrix(
+    pm_titles: List[str],
+    kalshi_titles: List[str],
+    date_valid: np.ndarray,
+    score_cutoff: float = 0.0
+) -> np.ndarray:
+    """
+    Compute the N x M title similarity matrix for lowercased titles.
+    
+    Only pairs that passed the date check are scored; every other entry, and
+    any pair scoring below score_cutoff, is left at 0.0.
+    
+    Returns:
+        float64 array of similarity scores between 0.0 and 1.0
+    """
+    similarity = np.zeros(date_valid.shape, dtype=np.float64)
+    
+    # Block on the date check: titles with no date-compatible partner are never scored
+    rows = date_valid.any(axis=1).nonzero()[0]
+    cols = date_valid.any(axis=0).nonzero()[0]
+    if not len(rows):
+        return similarity
+    
+    if process is not None:
+        # Vectorized C++ scorer, spread across all cores; score_cutoff lets it
+        # bail out early on pairs that cannot reach the cutoff
+        block = process.cdist(
+            [pm_titles[i] for i in rows],
+            [kalshi_titles[j] for j in cols],
+            scorer=fuzz.ratio,
+            score_cutoff=score_cutoff * 100,
+            dtype=np.float64,
+            workers=-1
+        )
+        similarity[np.ix_(rows, cols)] = block / 100.0
+        similarity[~date_valid] = 0.0
+        return similarity
+    
+    # A perfect score cannot be beaten, so once a PM title has one the rest of
+    # its row is skipped (the earliest perfect match is kept, as argmax would)
+    perfect = np.zeros(len(pm_titles), dtype=bool)
+    
+    if _c_ratio is not None:
+        for i, j in zip(*date_valid.nonzero()):
+            if perfect[i]:
+                continue
+            pm_title, kalshi_title = pm_titles[i], kalshi_titles[j]
+            # 2 * min(len) / total bounds the ratio from above
+            total = len(pm_title) + len(kalshi_title)
+            if total and 2 * min(len(pm_title), len(kalshi_title)) < score_cutoff * total:
+                continue
+            similarity[i, j] = _cached_ratio(pm_title, kalshi_title)
+            perfect[i] = similarity[i, j] >= 1.0
+        return similarity
+    
+    # SequenceMatcher caches its index of the second sequence, so hold each
+    # kalshi title fixed in seq2 and sweep the PM titles through seq1 for the
+    # screens; pairs that pass are scored through the cross-scan cache
+    matcher = SequenceMatcher()
+    for j in cols:
+        matcher.set_seq2(kalshi_titles[j])
+        for i in (date_valid[:, j] & ~perfect).nonzero()[0]:
+            matcher.set_seq1(pm_titles[i])
+            # Cheap upper bounds on ratio() screen out most pairs before the
+            # full matching-blocks search
+            if matcher.real_quick_ratio() < score_cutoff or matcher.quick_ratio() < score_cutoff:
+                continue
+            # Same (pm, kalshi) order as matcher, so the cached score is identical
+            similarity[i, j] = _cached_ratio(pm_titles[i], kalshi_titles[j])
+            perfect[i] = similarity[i, j] >= 1.0
+    return similarity
 
 
 def match_events(
@@ -39,65 +160,68 @@ def match_events(
         print(f"  [DEBUG] Matching {len(polymarket_events)} PM events against {len(kalshi_events)} Manifold events")
         print(f"  [DEBUG] Threshold: {title_similarity_threshold:.2f}, Date tolerance: {date_tolerance_days} days")
     
-    top_similarities = []  # Track top similarities for debugging
+    if not polymarket_events or not kalshi_events:
+        return matched_pairs
+    
+    # Titles are lowercased once by the platform clients at normalization
+    pm_titles = [e['title_lc'] for e in polymarket_events]
+    kalshi_titles = [e['title_lc'] for e in kalshi_events]
     
-    for pm_event in polymarket_events:
-        pm_end_date = pm_event['end_date']
+    # Check date match (within tolerance) for every pair in one broadcast pass
+    pm_secs = np.fromiter(
+        (e['end_date'].timestamp() for e in polymarket_events), dtype=np.float64, count=len(polymarket_events)
+    )
+    kalshi_secs = np.fromiter(
+        (e['end_date'].timestamp() for e in kalshi_events), dtype=np.float64, count=len(kalshi_events)
+    )
+    date_diff_seconds = np.abs(pm_secs[:, None] - kalshi_secs[None, :])
+    max_diff_seconds = date_tolerance_days * 24 * 60 * 60
+    date_valid = date_diff_seconds <= max_diff_seconds
+    
+    # Calculate title similarity for date-matched pairs; debug mode keeps
+    # scores down to 0.3 so near misses can be reported
+    score_cutoff = min(title_similarity_threshold, 0.3) if debug else title_similarity_threshold
+    similarity = _similarity_matrix(pm_titles, kalshi_titles, date_valid, score_cutoff)
+    
+    # First best match per PM event (argmax keeps the earliest on ties)
+    best_j = similarity.argmax(axis=1)
+    best_similarity = similarity[np.arange(len(polymarket_events)), best_j]
+    
+    for i, pm_event in enumerate(polymarket_events):
         pm_title = pm_event['title']
         
-        best_match = None
-        best_similarity = 0.0
-        date_filtered_count = 0
-        similarity_filtered_count = 0
-        
-        for kalshi_event in kalshi_events:
-            kalshi_end_date = kalshi_event['end_date']
-            kalshi_title = kalshi_event['title']
-            
-            # Check date match (within tolerance)
-            date_diff_seconds = abs((pm_end_date - kalshi_end_date).total_seconds())
-            date_diff_days = date_diff_seconds / 86400
-            max_diff_seconds = date_tolerance_days * 24 * 60 * 60
-            
-            if date_diff_seconds > max_diff_seconds:
-                date_filtered_count += 1
-                continue
-            
-            # Calculate title similarity
-            similarity = calculate_title_similarity(pm_title, kalshi_title)
-            
-            # Track top similarities for debugging
-            if debug and similarity > 0.3:  # Only track reasonable similarities
-                top_similarities.append({
-                    'pm_title': pm_title[:50],
-                    'manifold_title': kalshi_title[:50],
-                    'similarity': similarity,
-                    'date_diff_days': date_diff_days
-                })
-            
-            if similarity >= title_similarity_threshold and similarity > best_similarity:
-                best_match = kalshi_event
-                best_similarity = similarity
-            elif similarity < title_similarity_threshold:
-                similarity_filtered_count += 1
-        
-        if best_match is not None:
+        if best_similarity[i] > 0 and best_similarity[i] >= title_similarity_threshold:
+            best_match = kalshi_events[best_j[i]]
             matched_pairs.append((pm_event, best_match))
             if debug:
-                date_diff = abs((pm_end_date - best_match['end_date']).total_seconds() / 86400)
+                date_diff = date_diff_seconds[i, best_j[i]] / 86400
                 print(f"    ✓ MATCH: '{pm_title[:45]}' <-> '{best_match['title'][:45]}'")
-                print(f"      Similarity: {best_similarity:.3f}, Date diff: {date_diff:.1f} days")
+                print(f"      Similarity: {best_similarity[i]:.3f}, Date diff: {date_diff:.1f} days")
         elif debug and len(polymarket_events) <= 5:  # Only show details for small sets
+            date_filtered_count = int((~date_valid[i]).sum())
+            similarity_filtered_count = int((date_valid[i] & (similarity[i] < title_similarity_threshold)).sum())
             print(f"    ✗ No match for: '{pm_title[:50]}'")
             print(f"      Date filtered: {date_filtered_count}, Similarity filtered: {similarity_filtered_count}")
     
-    if debug and top_similarities:
-        # Show top 5 similarities that didn't match
-        top_similarities.sort(key=lambda x: x['similarity'], reverse=True)
-        print(f"  [DEBUG] Top similarities (below threshold):")
-        for i, item in enumerate(top_similarities[:5], 1):
-            print(f"    {i}. {item['similarity']:.3f} | Date diff: {item['date_diff_days']:.1f}d")
-            print(f"       PM: '{item['pm_title']}'")
-            print(f"       MF: '{item['manifold_title']}'")
+    if debug:
+        # Track top similarities for debugging (only reasonable similarities)
+        top_similarities = [
+            {
+                'pm_title': polymarket_events[i]['title'][:50],
+                'manifold_title': kalshi_events[j]['title'][:50],
+                'similarity': similarity[i, j],
+                'date_diff_days': date_diff_seconds[i, j] / 86400
+            }
+            for i, j in zip(*np.nonzero(similarity > 0.3))
+        ]
+        
+        if top_similarities:
+            # Show top 5 similarities that didn't match
+            top_similarities.sort(key=lambda x: x['similarity'], reverse=True)
+            print(f"  [DEBUG] Top similarities (below threshold):")
+            for i, item in enumerate(top_similarities[:5], 1):
+                print(f"    {i}. {item['similarity']:.3f} | Date diff: {item['date_diff_days']:.1f}d")
+                print(f"       PM: '{item['pm_title']}'")
+                print(f"       MF: '{item['manifold_title']}'")
     
     return matched_pairs
@@ -0,0 +1,43 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+C implementation of the title similarity ratio for matcher.py.
+
+Only used when rapidfuzz is not installed. Build in place with
+`cythonize -i matcher_impl.pyx`, or let matcher.py compile it on first
+import through pyximport (needs Cython and a C compiler); if neither works
+matcher.py falls back to difflib.
+"""
+from array import array
+
+
+cpdef double ratio(str title1, str title2):
+    """
+    Normalized Indel similarity: 2 * LCS / (len(title1) + len(title2)).
+    
+    Same score as rapidfuzz's fuzz.ratio (scaled to 0.0-1.0).
+    """
+    cdef Py_ssize_t len1 = len(title1), len2 = len(title2)
+    if len1 + len2 == 0:
+        return 1.0
+    if len1 == 0 or len2 == 0:
+        return 0.0
+    
+    cdef int[:] s1 = array('i', map(ord, title1))
+    cdef int[:] s2 = array('i', map(ord, title2))
+    # Single DP row: row[j] = LCS(title1[:i], title2[:j])
+    cdef int[:] row = array('i', [0]) * (len2 + 1)
+    cdef Py_ssize_t i, j
+    cdef int c, diag, above
+    
+    for i in range(len1):
+        c = s1[i]
+        diag = 0
+        for j in range(1, len2 + 1):
+            above = row[j]
+            if c == s2[j - 1]:
+                row[j] = diag + 1
+            elif row[j - 1] > above:
+                row[j] = row[j - 1]
+            diag = above
+    
+    return 2.0 * row[len2] / (len1 + len2)
@@ -1,10 +1,11 @@
 import os
 import asyncio
 import time
-import requests
+import aiohttp
+from collections import OrderedDict
 from datetime import datetime, timezone, timedelta
 from dotenv import load_dotenv
-from platforms import PolymarketClient, ManifoldPlatformClient
+from platforms import PolymarketClient, PolymarketBookCache, ManifoldPlatformClient
 from matcher import match_events
 from arbitrage import find_arbitrage_opportunities
 from stats_writer import write_scan_stats
@@ -23,6 +24,8 @@ SCAN_INTERVAL = 60
 MIN_PROFIT_AFTER_FEES_PCT = 0.5
 # Don't re-alert the same event within this many seconds
 ALERT_COOLDOWN_SECONDS = 30 * 60  # 30 minutes
+# Most alert keys remembered for the cooldown; the least recently alerted are dropped
+MAX_COOLDOWN_ENTRIES = 10_000
 # Optional: skip events with liquidity below this (0 = disabled)
 MIN_LIQUIDITY_USD = 0
 # Extra console output (e.g. failed outcomes)
@@ -32,39 +35,74 @@ DEBUG = os.getenv("DEBUG", "").strip().lower() in ("1", "true", "yes")
 TITLE_SIMILARITY_THRESHOLD = 0.5  # Lowered from 0.7 to catch more potential matches
 DATE_MATCH_TOLERANCE_DAYS = 3  # Increased from 1 to 3 days for more flexibility
 
-# Cutoff: 3 days from now
-now_utc = datetime.now(timezone.utc)
-cutoff_time = now_utc + timedelta(days=3)
+# Only consider events resolving within this many days of each scan
+MAX_RESOLUTION_DAYS = 3
 
-def send_telegram_msg(message):
+# Alert formatting
+PM_PREFIX = "https://polymarket.com/event/"
+MF_PREFIX = "https://manifold.markets/"
+DIRECTION_STR = {
+    'pm_yes_kalshi_no': "Buy YES on Polymarket + NO on Manifold",
+    'pm_no_kalshi_yes': "Buy NO on Polymarket + YES on Manifold",
+}
+
+# Telegram sends in flight; referenced here so they aren't garbage-collected
+# before finishing, and awaited on shutdown
+pending_alerts = set()
+
+async def send_telegram_msg_async(session, message):
     token = os.getenv("TELEGRAM_BOT_TOKEN")
     chat_id = os.getenv("TELEGRAM_CHAT_ID")
     if not (token and chat_id): return
     url = f"https://api.telegram.org/bot{token}/sendMessage"
     payload = {"chat_id": chat_id, "text": message, "parse_mode": "Markdown"}
     try:
-        requests.post(url, json=payload, timeout=10)
+        async with session.post(url, json=payload, timeout=aiohttp.ClientTimeout(total=10)) as response:
+            await response.read()
     except Exception as e:
         print(f"⚠️ Telegram Error: {e}")
 
+def queue_telegram_msg(session, message):
+    """Send a Telegram message in the background so it never stalls the scan loop."""
+    task = asyncio.create_task(send_telegram_msg_async(session, message))
+    pending_alerts.add(task)
+    task.add_done_callback(pending_alerts.discard)
+
+def fetch_result(client, result):
+    """Unwrap a gather(return_exceptions=True) result, logging failures as an empty list."""
+    if isinstance(result, BaseException):
+        print(f"⚠️ {client.get_platform_name()} fetch error: {result}")
+        return []
+    return result
+
 async def main():
+    # One pooled session for Polymarket Gamma, Manifold and Telegram: connections and DNS lookups
+    # are reused across scans instead of re-handshaking on every request
+    connector = aiohttp.TCPConnector(limit=100, ttl_dns_cache=300)
+    http_session = aiohttp.ClientSession(connector=connector)
+
+    # Polymarket books streamed over WebSocket; tokens are subscribed as get_events finds them
+    book_cache = PolymarketBookCache(session=http_session)
+
     # Initialize platform clients
     pm_client = PolymarketClient(
         private_key=os.getenv("POLYMARKET_PRIVATE_KEY"),
         api_key=os.getenv("CLOB_API_KEY"),
         api_secret=os.getenv("CLOB_SECRET"),
-        api_passphrase=os.getenv("CLOB_PASSPHRASE")
+        api_passphrase=os.getenv("CLOB_PASSPHRASE"),
+        session=http_session,
+        book_cache=book_cache
     )
     
     # Manifold API key is optional (not needed for reading market data)
     manifold_api_key = os.getenv("MANIFOLD_API_KEY")
-    manifold_client = ManifoldPlatformClient(api_key=manifold_api_key)
+    manifold_client = ManifoldPlatformClient(api_key=manifold_api_key, session=http_session)
 
-    # Cooldown: event_id -> last alert time
-    last_alerted = {}
+    # Cooldown: (pm_id, manifold_id, direction) -> last alert time (monotonic), oldest first
+    last_alerted = OrderedDict()
 
     print("Cross-Platform Arbitrage Scanner Active")
-    print(f"Max resolution: {cutoff_time.strftime('%Y-%m-%d %H:%M')} UTC")
+    print(f"Max resolution: {MAX_RESOLUTION_DAYS} days ahead (refreshed every scan)")
     print(f"Min profit after fees: {MIN_PROFIT_AFTER_FEES_PCT}% | Alert cooldown: {ALERT_COOLDOWN_SECONDS // 60} min")
     print(f"Title similarity threshold: {TITLE_SIMILARITY_THRESHOLD} | Date tolerance: {DATE_MATCH_TOLERANCE_DAYS} days")
     
@@ -72,16 +110,34 @@ async def main():
         "Cross-Platform Arb Scanner Online\n"
         f"Min profit: {MIN_PROFIT_AFTER_FEES_PCT}% (after fees) | Cooldown: {ALERT_COOLDOWN_SECONDS // 60} min"
     )
-    send_telegram_msg(startup_msg)
+    queue_telegram_msg(http_session, startup_msg)
 
+    try:
+        await scan_loop(pm_client, manifold_client, http_session, last_alerted)
+    finally:
+        await asyncio.gather(*pending_alerts, return_exceptions=True)
+        await pm_client.close()
+        await manifold_client.close()
+        await book_cache.close()
+        await http_session.close()
+
+async def scan_loop(pm_client, manifold_client, tg_session, last_alerted):
     while True:
         try:
-            # Fetch events from both platforms in parallel
-            pm_events_task = pm_client.get_events(limit=50, max_resolution_days=3)
-            manifold_events_task = manifold_client.get_events(limit=50, max_resolution_days=3)
+            # One cutoff per scan, shared by both platforms
+            cutoff_time = datetime.now(timezone.utc) + timedelta(days=MAX_RESOLUTION_DAYS)
             
-            pm_events = await pm_events_task
-            manifold_events = await manifold_events_task
+            # Fetch events from both platforms in parallel; one platform failing
+            # shouldn't throw away the other's results
+            results = await asyncio.gather(
+                pm_client.get_events(limit=50, cutoff_time=cutoff_time),
+                manifold_client.get_events(limit=50, cutoff_time=cutoff_time),
+                return_exceptions=True
+            )
+            pm_events, manifold_events = [
+                fetch_result(client, result)
+                for client, result in zip((pm_client, manifold_client), results)
+            ]
             
             if DEBUG:
                 print(f"  [DEBUG] Fetched {len(pm_events)} Polymarket events, {len(manifold_events)} Manifold events")
@@ -94,8 +150,10 @@ async def main():
                     for i, e in enumerate(manifold_events[:3]):
                         print(f"    {i+1}. '{e['title'][:60]}' | Resolves: {e['end_date'].strftime('%Y-%m-%d %H:%M')}")
             
-            # Match events between platforms
-            matched_events = match_events(
+            # Match events between platforms; CPU-bound, so run it off the event loop
+            # to keep in-flight Telegram sends moving
+            matched_events = await asyncio.to_thread(
+                match_events,
                 polymarket_events=pm_events,
                 kalshi_events=manifold_events,  # matcher uses generic name but works for any platform
                 title_similarity_threshold=TITLE_SIMILARITY_THRESHOLD,
@@ -114,7 +172,8 @@ async def main():
                         print(f"      Similarity: {sim:.3f}, Date diff: {date_diff:.1f} days")
             
             # Find arbitrage opportunities
-            opportunities = find_arbitrage_opportunities(
+            opportunities = await asyncio.to_thread(
+                find_arbitrage_opportunities,
                 matched_events=matched_events,
                 polymarket_client=pm_client,
                 kalshi_client=manifold_client,  # arbitrage uses generic name but works for any platform
@@ -128,13 +187,25 @@ async def main():
             for opp in opportunities:
                 pm_event = opp['pm_event']
                 manifold_event = opp['kalshi_event']  # variable name from arbitrage.py
+                
+                # Create unique event ID for cooldown tracking; checked before any
+                # formatting so suppressed opportunities cost no string building
+                event_id = (pm_event['id'], manifold_event['id'], opp['direction'])
+                
+                now = time.monotonic()
+                last = last_alerted.get(event_id)
+                if last is not None and now - last < ALERT_COOLDOWN_SECONDS:
+                    continue
+
+                last_alerted[event_id] = now
+                last_alerted.move_to_end(event_id)
+                if len(last_alerted) > MAX_COOLDOWN_ENTRIES:
+                    last_alerted.popitem(last=False)
+                
                 title = pm_event['title'][:50]
                 
                 # Format direction for display
-                if opp['direction'] == 'pm_yes_kalshi_no':
-                    direction_str = "Buy YES on Polymarket + NO on Manifold"
-                else:
-                    direction_str = "Buy NO on Polymarket + YES on Manifold"
+                direction_str = DIRECTION_STR[opp['direction']]
                 
                 print(
                     f"  | {title} | {direction_str}\n"
@@ -143,47 +214,41 @@ async def main():
                     f"    Cost=${opp['total_cost']:.4f} Cost+ fees=${opp['total_cost_with_fees']:.4f} "
                     f"Profit=${opp['profit']:.4f} ({opp['profit_pct']:.2f}%)"
                 )
-
-                # Create unique event ID for cooldown tracking
-                event_id = f"{pm_event['id']}_{manifold_event['id']}_{opp['direction']}"
                 
-                now = time.time()
-                if now - last_alerted.get(event_id, 0) < ALERT_COOLDOWN_SECONDS:
-                    continue
-
-                last_alerted[event_id] = now
                 alerts_sent += 1
                 
                 # Get links
                 pm_slug = pm_event.get('raw_data', {}).get('slug', '')
-                pm_link = f"https://polymarket.com/event/{pm_slug}" if pm_slug else ""
+                pm_link = PM_PREFIX + pm_slug if pm_slug else ""
                 manifold_id = manifold_event.get('id', '')
                 manifold_raw = manifold_event.get('raw_data', {})
                 creator_username = manifold_raw.get('creatorUsername', '')
                 manifold_slug = manifold_raw.get('slug', '')
                 if creator_username and manifold_slug:
-                    manifold_link = f"https://manifold.markets/{creator_username}/{manifold_slug}"
+                    manifold_link = f"{MF_PREFIX}{creator_username}/{manifold_slug}"
                 elif manifold_id:
-                    manifold_link = f"https://manifold.markets/{manifold_id}"
+                    manifold_link = MF_PREFIX + manifold_id
                 else:
                     manifold_link = ""
                 
                 # Format alert message
-                alert = (
-                    "*CROSS-PLATFORM ARB*\n"
-                    f"{pm_event['title']}\n\n"
-                    f"Direction: `{direction_str}`\n"
-                    f"Polymarket YES/NO: `${opp['pm_price']:.4f}`/`${pm_event['markets'][0]['no_price']:.4f}`\n"
-                    f"Manifold YES/NO: `${manifold_event['markets'][0]['yes_price']:.4f}`/`${opp['kalshi_price']:.4f}`\n"
-                    f"Cost (after fees)=`${opp['total_cost_with_fees']:.4f}` Payout=`${opp['payout']:.1f}`\n"
-                    f"Profit=`${opp['profit']:.4f}` (`${opp['profit_pct']:.2f}%`)\n"
-                )
+                alert_lines = [
+                    "*CROSS-PLATFORM ARB*",
+                    pm_event['title'],
+                    "",
+                    f"Direction: `{direction_str}`",
+                    f"Polymarket YES/NO: `${opp['pm_price']:.4f}`/`${pm_event['markets'][0]['no_price']:.4f}`",
+                    f"Manifold YES/NO: `${manifold_event['markets'][0]['yes_price']:.4f}`/`${opp['kalshi_price']:.4f}`",
+                    f"Cost (after fees)=`${opp['total_cost_with_fees']:.4f}` Payout=`${opp['payout']:.1f}`",
+                    f"Profit=`${opp['profit']:.4f}` (`${opp['profit_pct']:.2f}%`)",
+                    "",
+                ]
                 if pm_link:
-                    alert += f"\nPolymarket: {pm_link}"
+                    alert_lines.append("Polymarket: " + pm_link)
                 if manifold_link:
-                    alert += f"\nManifold: {manifold_link}"
+                    alert_lines.append("Manifold: " + manifold_link)
                 
-                send_telegram_msg(alert)
+                queue_telegram_msg(tg_session, "\n".join(alert_lines))
 
             print(f"[{ts}] Scanned {len(pm_events)} PM events, {len(manifold_events)} Manifold events, "
                   f"{len(matched_events)} matched, {len(opportunities)} opportunity(ies), {alerts_sent} alerted")
@@ -211,4 +276,10 @@ async def main():
             await asyncio.sleep(10)
 
 if __name__ == "__main__":
+    try:
+        # Optional: libuv-based event loop with cheaper socket I/O
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     asyncio.run(main())
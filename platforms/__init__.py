@@ -1,5 +1,5 @@
 from .base import PlatformClient
-from .polymarket import PolymarketClient
+from .polymarket import PolymarketClient, PolymarketBookCache
 from .manifold import ManifoldPlatformClient
 
-__all__ = ['PlatformClient', 'PolymarketClient', 'ManifoldPlatformClient']
+__all__ = ['PlatformClient', 'PolymarketClient', 'PolymarketBookCache', 'ManifoldPlatformClient']
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from functools import cached_property
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 
@@ -7,15 +8,23 @@ class PlatformClient(ABC):
     """Abstract base class for prediction market platform clients."""
     
     @abstractmethod
-    async def get_events(self, limit: int = 50, max_resolution_days: int = 3) -> List[Dict]:
+    async def get_events(self, limit: int = 50, max_resolution_days: int = 3,
+                         cutoff_time: Optional[datetime] = None) -> List[Dict]:
         """
         Fetch active events from the platform.
         
+        Args:
+            limit: Maximum number of events to fetch
+            max_resolution_days: Only include events resolving within this many days
+            cutoff_time: Explicit resolution cutoff (UTC); overrides max_resolution_days
+                         so callers can share one clock reading across platforms
+            
         Returns:
             List of normalized event dictionaries with structure:
             {
                 'id': str,
                 'title': str,
+                'title_lc': str,  # Lowercased title, precomputed for matching
                 'end_date': datetime,
                 'markets': [
                     {
@@ -26,7 +35,7 @@ class PlatformClient(ABC):
                     }
                 ],
                 'platform': str,
-                'raw_data': dict  # Original platform data
+                'raw_data': dict  # Platform fields needed downstream (e.g. link slugs)
             }
         """
         pass
@@ -55,7 +64,16 @@ class PlatformClient(ABC):
         """
         pass
     
+    @cached_property
+    def fee_rate(self) -> float:
+        """Fee rate from get_fee_rate(), resolved once per client instance."""
+        return self.get_fee_rate()
+    
     @abstractmethod
     def get_platform_name(self) -> str:
         """Return the platform name."""
         pass
+    
+    async def close(self):
+        """Release any network resources held by the client."""
+        pass
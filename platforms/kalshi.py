@@ -1,9 +1,15 @@
 import os
+import time
 from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Optional, Tuple
 from kalshi_python import Configuration
 from .base import PlatformClient
 
+# Seconds a single-market price fetched by ticker is reused
+PRICE_CACHE_TTL = 2.0
+# Seconds an event without any priced market is skipped before being retried
+SKIP_TTL = 600.0
+
 
 class KalshiPlatformClient(PlatformClient):
     """Client for Kalshi prediction markets."""
@@ -28,14 +34,59 @@ class KalshiPlatformClient(PlatformClient):
         
         from kalshi_python import KalshiClient as KalshiSDKClient
         self.client = KalshiSDKClient(config)
+        # (event_id, market_id) -> normalized market, refreshed by get_events()
+        self._market_index: Dict[Tuple[str, str], Dict] = {}
+        # market_id -> (expiry on the monotonic clock, prices) for by-ticker lookups
+        self._price_cache: Dict[str, Tuple[float, Optional[Tuple[float, float]]]] = {}
+        # event_ticker -> monotonic time it was last rejected for having no priced markets
+        self._skip_ids: Dict[str, float] = {}
     
     def _cents_to_decimal(self, cents: int) -> float:
         """Convert Kalshi price from cents to decimal (e.g., 50 cents -> 0.50)."""
         return cents / 100.0
     
-    async def get_events(self, limit: int = 50, max_resolution_days: int = 3) -> List[Dict]:
+    def _normalize_market(self, market) -> Optional[Dict]:
+        """Normalize an SDK market; returns None if no price can be determined."""
+        # Kalshi prices are in cents, convert to decimal
+        yes_bid = getattr(market, 'yes_bid', None)
+        yes_ask = getattr(market, 'yes_ask', None)
+        no_bid = getattr(market, 'no_bid', None)
+        no_ask = getattr(market, 'no_ask', None)
+        if yes_ask is None and no_ask is None and yes_bid is None and no_bid is None:
+            return None
+        
+        # Use ask price (price to buy)
+        yes_price = self._cents_to_decimal(yes_ask) if yes_ask is not None else None
+        no_price = self._cents_to_decimal(no_ask) if no_ask is not None else None
+        
+        # If ask not available, infer from bid or use midpoint
+        if yes_price is None and yes_bid is not None:
+            yes_price = self._cents_to_decimal(yes_bid)
+        if no_price is None and no_bid is not None:
+            no_price = self._cents_to_decimal(no_bid)
+        
+        # If still missing, infer from other side
+        if yes_price is None and no_price is not None:
+            yes_price = 1.0 - no_price
+        if no_price is None and yes_price is not None:
+            no_price = 1.0 - yes_price
+        
+        if yes_price is None or no_price is None:
+            return None
+        
+        return {
+            'id': getattr(market, 'ticker', ''),
+            'question': getattr(market, 'title', ''),
+            'yes_price': yes_price,
+            'no_price': no_price
+        }
+    
+    async def get_events(self, limit: int = 50, max_resolution_days: int = 3,
+                         cutoff_time: Optional[datetime] = None) -> List[Dict]:
         """Fetch active events from Kalshi."""
-        cutoff_time = datetime.now(timezone.utc) + timedelta(days=max_resolution_days)
+        if cutoff_time is None:
+            cutoff_time = datetime.now(timezone.utc) + timedelta(days=max_resolution_days)
+        cutoff_ts = cutoff_time.timestamp()
         
         try:
             # Get events with nested markets
@@ -49,6 +100,9 @@ class KalshiPlatformClient(PlatformClient):
             return []
         
         normalized_events = []
+        market_index = {}
+        now = time.monotonic()
+        skip_ids = self._skip_ids = {k: t for k, t in self._skip_ids.items() if now - t < SKIP_TTL}
         
         for event in response.events:
             # Parse end date
@@ -56,16 +110,22 @@ class KalshiPlatformClient(PlatformClient):
             if not end_ts:
                 continue
             
+            # Compare raw timestamps; only build a datetime for survivors
             try:
+                if end_ts > cutoff_ts:
+                    continue
                 end_dt = datetime.fromtimestamp(end_ts, tz=timezone.utc)
             except (ValueError, TypeError):
                 continue
             
-            if end_dt > cutoff_time:
+            # Events recently found without prices would only be rejected again,
+            # possibly after an extra get_markets round trip
+            event_id = getattr(event, 'event_ticker', '')
+            if event_id in skip_ids:
                 continue
             
             # Get markets for this event
-            markets = event.markets if hasattr(event, 'markets') and event.markets else []
+            markets = getattr(event, 'markets', None) or []
             
             if not markets:
                 # Try fetching markets separately if not nested
@@ -75,77 +135,78 @@ class KalshiPlatformClient(PlatformClient):
                         status="open",
                         limit=100
                     )
-                    markets = markets_response.markets if hasattr(markets_response, 'markets') else []
+                    markets = getattr(markets_response, 'markets', None) or []
                 except Exception:
                     continue
             
             if not markets:
+                # Ticker-less events share the '' key, so only real tickers are skipped
+                if event_id:
+                    skip_ids[event_id] = now
                 continue
             
             # Normalize markets
             normalized_markets = []
             for market in markets:
-                # Kalshi prices are in cents, convert to decimal
-                yes_bid = market.yes_bid if hasattr(market, 'yes_bid') else None
-                yes_ask = market.yes_ask if hasattr(market, 'yes_ask') else None
-                no_bid = market.no_bid if hasattr(market, 'no_bid') else None
-                no_ask = market.no_ask if hasattr(market, 'no_ask') else None
-                
-                # Use ask price (price to buy)
-                yes_price = self._cents_to_decimal(yes_ask) if yes_ask is not None else None
-                no_price = self._cents_to_decimal(no_ask) if no_ask is not None else None
-                
-                # If ask not available, infer from bid or use midpoint
-                if yes_price is None and yes_bid is not None:
-                    yes_price = self._cents_to_decimal(yes_bid)
-                if no_price is None and no_bid is not None:
-                    no_price = self._cents_to_decimal(no_bid)
-                
-                # If still missing, infer from other side
-                if yes_price is None and no_price is not None:
-                    yes_price = 1.0 - no_price
-                if no_price is None and yes_price is not None:
-                    no_price = 1.0 - yes_price
-                
-                if yes_price is None or no_price is None:
-                    continue
-                
-                normalized_markets.append({
-                    'id': market.ticker if hasattr(market, 'ticker') else '',
-                    'question': market.title if hasattr(market, 'title') else '',
-                    'yes_price': yes_price,
-                    'no_price': no_price
-                })
+                normalized_market = self._normalize_market(market)
+                if normalized_market is not None:
+                    normalized_markets.append(normalized_market)
             
             if not normalized_markets:
+                if event_id:
+                    skip_ids[event_id] = now
                 continue
             
+            for normalized_market in normalized_markets:
+                market_index[(event_id, normalized_market['id'])] = normalized_market
+            
+            title = getattr(event, 'title', '')
             normalized_events.append({
-                'id': event.event_ticker if hasattr(event, 'event_ticker') else '',
-                'title': event.title if hasattr(event, 'title') else '',
+                'id': event_id,
+                'title': title,
+                'title_lc': title.lower(),
                 'end_date': end_dt,
                 'markets': normalized_markets,
                 'platform': 'kalshi',
-                'raw_data': event.__dict__ if hasattr(event, '__dict__') else {}
+                # Only identifying fields; holding the SDK object would keep the whole response alive
+                'raw_data': {
+                    'event_ticker': event_id,
+                    'series_ticker': getattr(event, 'series_ticker', None)
+                }
             })
         
+        self._market_index = market_index
         return normalized_events
     
     async def get_market_prices(self, event_id: str, market_id: str) -> Optional[Tuple[float, float]]:
         """
         Get YES and NO prices for a specific market.
         
-        Note: This requires fetching the event first to find the market.
-        For efficiency, prefer using get_events() which includes prices.
+        Served from the index built by the last get_events() call; markets
+        not in it are fetched individually by ticker and reused for
+        PRICE_CACHE_TTL seconds.
         """
-        events = await self.get_events(limit=200)
-        for event in events:
-            if event['id'] == event_id:
-                for market in event['markets']:
-                    if market['id'] == market_id:
-                        if market['yes_price'] is not None and market['no_price'] is not None:
-                            return (market['yes_price'], market['no_price'])
-        return None
+        market = self._market_index.get((event_id, market_id))
+        if market is not None:
+            return (market['yes_price'], market['no_price'])
+        
+        now = time.monotonic()
+        cached = self._price_cache.get(market_id)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        
+        try:
+            response = self.client.get_market(ticker=market_id)
+        except Exception as e:
+            print(f"Kalshi API error getting market {market_id}: {e}")
+            return None
+        market = self._normalize_market(getattr(response, 'market', response))
+        prices = (market['yes_price'], market['no_price']) if market is not None else None
+        
+        if len(self._price_cache) >= 1024:
+            self._price_cache = {k: v for k, v in self._price_cache.items() if v[0] > now}
+        self._price_cache[market_id] = (now + PRICE_CACHE_TTL, prices)
+        return prices
     
     def get_fee_rate(self) -> float:
         """Kalshi fee rate is 10% (0.10)."""
@@ -1,80 +1,252 @@
-import requests
+import aiohttp
+import msgspec
+import numpy as np
+import time
 from datetime import datetime, timezone, timedelta
+from operator import attrgetter
 from typing import List, Dict, Optional, Tuple
 from .base import PlatformClient
 
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30)
+# Re-list via search-markets this often to pick up newly listed markets
+FULL_RESYNC_SECONDS = 600
+# /markets page size and page budget for one update poll
+DELTA_PAGE_SIZE = 500
+MAX_DELTA_PAGES = 4
+# Re-read updates this far before the last poll to absorb clock skew
+POLL_OVERLAP_MS = 30_000
+# Full syncs list this many times the requested markets, so markets that close
+# between syncs are replaced from the cache instead of shrinking the listing
+SYNC_OVERFETCH = 2
+
+
+class Market(msgspec.Struct):
+    """The fields of a Manifold market payload this client reads; the rest are skipped while decoding."""
+    id: str
+    question: str = ''
+    closeTime: Optional[int] = None
+    probability: float = 0.5
+    isResolved: bool = False
+    lastUpdatedTime: Optional[int] = None
+    outcomeType: str = ''
+    slug: str = ''
+    creatorUsername: str = ''
+
+
+_decode_markets = msgspec.json.Decoder(List[Market]).decode
+_decode_market = msgspec.json.Decoder(Market).decode
+
 
 class ManifoldPlatformClient(PlatformClient):
     """Client for Manifold Markets prediction markets."""
     
     BASE_URL = "https://api.manifold.markets/v0"
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, session: Optional[aiohttp.ClientSession] = None):
         """
         Initialize Manifold client.
         
         Args:
             api_key: Optional Manifold API key for authenticated requests
                      (not required for reading market data)
+            session: Optional shared HTTP session; the caller keeps ownership and closes it
         """
         self.api_key = api_key
-        self.session = requests.Session()
-        if api_key:
-            self.session.headers.update({
-                'Authorization': f'Key {api_key}'
-            })
+        # Sent per request so a shared session doesn't leak the key to other hosts
+        self.headers = {'Authorization': f'Key {api_key}'} if api_key else {}
+        # Created lazily when not injected: an aiohttp session must be opened
+        # inside the running event loop
+        self.session: Optional[aiohttp.ClientSession] = session
+        self._owns_session = session is None
+        # search-markets limit -> (ETag, markets payload) of the last response
+        self._etags: Dict[int, Tuple[str, List[Market]]] = {}
+        # Authoritative raw market cache, kept current by update polls between full syncs
+        self._markets_by_id: Dict[str, Market] = {}
+        self._synced_limit: Optional[int] = None
+        self._last_full_sync = float('-inf')
+        self._last_poll_ms = 0
+        # closeTime of the last market in a full listing: later-closing markets
+        # weren't listed, so the cache is only complete up to here (None: no limit)
+        self._horizon_ms: Optional[int] = None
+        # market id -> normalized event and the lastUpdatedTime it was built from
+        self._cache: Dict[str, Dict] = {}
+        self._last_updated: Dict[str, int] = {}
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use."""
+        if self._owns_session and (self.session is None or self.session.closed):
+            self.session = aiohttp.ClientSession(timeout=REQUEST_TIMEOUT)
+        return self.session
+    
+    async def close(self):
+        """Close the HTTP session, unless it was shared in by the caller."""
+        if self._owns_session and self.session is not None and not self.session.closed:
+            await self.session.close()
+    
+    async def _full_sync(self, api_limit: int):
+        """
+        Replace the market cache with the soonest-closing open binary markets.
+        
+        Args:
+            api_limit: Number of markets get_events serves; SYNC_OVERFETCH times
+                       as many are requested from search-markets
+        """
+        fetch_limit = min(api_limit * SYNC_OVERFETCH, 1000)  # API max is 1000
+        etag, cached_markets = self._etags.get(fetch_limit, (None, None))
+        poll_started_ms = int(time.time() * 1000) - POLL_OVERLAP_MS
+        
+        # Get open binary markets using search-markets endpoint
+        # /v0/markets doesn't support filter/contractType, but /v0/search-markets does
+        async with self._get_session().get(
+            f"{self.BASE_URL}/search-markets",
+            params={
+                'limit': fetch_limit,
+                'sort': 'close-date',
+                'filter': 'open',
+                'contractType': 'BINARY',
+                'term': ''  # Empty term to get all markets
+            },
+            # Conditional GET: a 304 means the previous payload is still current
+            headers={**self.headers, 'If-None-Match': etag} if etag else self.headers,
+            timeout=REQUEST_TIMEOUT
+        ) as response:
+            if response.status == 304 and cached_markets is not None:
+                markets = cached_markets
+            else:
+                response.raise_for_status()
+                markets = _decode_markets(await response.read())
+                if response.headers.get('ETag'):
+                    self._etags[fetch_limit] = (response.headers['ETag'], markets)
+        
+        self._markets_by_id = {m.id: m for m in markets if m.closeTime}
+        self._horizon_ms = (max(self._markets_by_id[k].closeTime for k in self._markets_by_id)
+                            if len(markets) >= fetch_limit and self._markets_by_id else None)
+        self._synced_limit = api_limit
+        self._last_full_sync = time.monotonic()
+        self._last_poll_ms = poll_started_ms
+    
+    async def _poll_updates(self) -> bool:
+        """
+        Merge markets updated since the last poll into the market cache.
+        
+        Pages through /markets newest-update-first and stops at the first market
+        older than the previous poll, so a quiet interval costs a single request.
+        
+        Returns:
+            False if more changed than the delta pages cover and a full sync is needed
+        """
+        since_ms = self._last_poll_ms
+        poll_started_ms = int(time.time() * 1000) - POLL_OVERLAP_MS
+        now_ms = poll_started_ms + POLL_OVERLAP_MS
+        markets_by_id = self._markets_by_id
+        params = {'limit': DELTA_PAGE_SIZE, 'sort': 'updated-time', 'order': 'desc'}
+        
+        for _ in range(MAX_DELTA_PAGES):
+            async with self._get_session().get(
+                f"{self.BASE_URL}/markets",
+                params=params,
+                headers=self.headers,
+                timeout=REQUEST_TIMEOUT
+            ) as response:
+                response.raise_for_status()
+                page = _decode_markets(await response.read())
+            
+            for market in page:
+                if (market.lastUpdatedTime or 0) <= since_ms:
+                    self._last_poll_ms = poll_started_ms
+                    return True
+                close_time = market.closeTime
+                if (market.outcomeType == 'BINARY' and not market.isResolved
+                        and close_time and close_time > now_ms):
+                    markets_by_id[market.id] = market
+                else:
+                    markets_by_id.pop(market.id, None)
+            
+            if len(page) < DELTA_PAGE_SIZE:
+                self._last_poll_ms = poll_started_ms
+                return True
+            params['before'] = page[-1].id
+        
+        return False
+    
+    def _listed_markets(self) -> List[Market]:
+        """
+        Drop markets that closed since they were fetched and return the rest
+        in close order, as the search-markets listing would.
+        
+        Returns:
+            Cached markets up to the synced horizon, soonest-closing first
+        """
+        now_ms = int(time.time() * 1000)
+        markets_by_id = self._markets_by_id
+        for market_id in [k for k, m in markets_by_id.items() if m.closeTime <= now_ms]:
+            del markets_by_id[market_id]
+        horizon_ms = self._horizon_ms
+        # Markets past the horizon only got here through an update poll; unlisted
+        # ones that closed sooner may be missing, so they can't be ranked yet
+        markets = [m for m in markets_by_id.values() if horizon_ms is None or m.closeTime <= horizon_ms]
+        markets.sort(key=attrgetter('closeTime'))
+        return markets
     
-    async def get_events(self, limit: int = 50, max_resolution_days: int = 3) -> List[Dict]:
+    async def get_events(self, limit: int = 50, max_resolution_days: int = 3,
+                         cutoff_time: Optional[datetime] = None) -> List[Dict]:
         """Fetch active events from Manifold."""
-        cutoff_time = datetime.now(timezone.utc) + timedelta(days=max_resolution_days)
+        if cutoff_time is None:
+            cutoff_time = datetime.now(timezone.utc) + timedelta(days=max_resolution_days)
         cutoff_ts_ms = int(cutoff_time.timestamp() * 1000)
         
+        api_limit = min(limit, 1000)  # API max is 1000
+        
         try:
-            # Get open binary markets using search-markets endpoint
-            # /v0/markets doesn't support filter/contractType, but /v0/search-markets does
-            response = self.session.get(
-                f"{self.BASE_URL}/search-markets",
-                params={
-                    'limit': min(limit, 1000),  # API max is 1000
-                    'sort': 'close-date',
-                    'filter': 'open',
-                    'contractType': 'BINARY',
-                    'term': ''  # Empty term to get all markets
-                },
-                timeout=30
-            )
-            response.raise_for_status()
-            markets = response.json()
+            # Full listing on first use and periodically after; cheap update polls in between
+            if (self._synced_limit != api_limit
+                    or time.monotonic() - self._last_full_sync >= FULL_RESYNC_SECONDS
+                    or not await self._poll_updates()):
+                await self._full_sync(api_limit)
+            markets = self._listed_markets()
+            # Too many listed markets have closed for the cache to fill the listing
+            if len(markets) < api_limit and self._horizon_ms is not None:
+                await self._full_sync(api_limit)
+                markets = self._listed_markets()
         except Exception as e:
             print(f"Manifold API error: {e}")
             return []
+        markets = markets[:api_limit]
         
         # Group markets by close date (events)
         # For Manifold, each market is essentially its own event
         normalized_events = []
+        # Rebuilt every call so markets that drop out of the listing are evicted
+        cache, last_updated = {}, {}
         
-        for market in markets:
-            # Skip markets closing too far in the future
-            close_time = market.get('closeTime')
-            if not close_time:
-                continue
-            
-            try:
-                close_dt = datetime.fromtimestamp(close_time / 1000, tz=timezone.utc)
-            except (ValueError, TypeError):
-                continue
+        # Filter on column arrays so only surviving markets are touched in Python
+        n = len(markets)
+        close_times = np.fromiter((m.closeTime or 0 for m in markets), dtype=np.int64, count=n)
+        resolved = np.fromiter((m.isResolved for m in markets), dtype=bool, count=n)
+        probs = np.fromiter((m.probability for m in markets), dtype=np.float64, count=n)
+        keep = (close_times > 0) & (close_times <= cutoff_ts_ms) & ~resolved
+        no_prices = 1.0 - probs
+        
+        for i in np.nonzero(keep)[0].tolist():
+            market = markets[i]
             
-            if close_dt > cutoff_time:
+            # Reuse the previous normalization if the market hasn't changed since
+            market_id = market.id
+            updated = market.lastUpdatedTime
+            cached = self._cache.get(market_id)
+            if cached is not None and updated is not None and self._last_updated.get(market_id) == updated:
+                cache[market_id], last_updated[market_id] = cached, updated
+                normalized_events.append(cached)
                 continue
             
-            # Skip resolved markets
-            if market.get('isResolved', False):
+            try:
+                close_dt = datetime.fromtimestamp(market.closeTime / 1000, tz=timezone.utc)
+            except (ValueError, TypeError, OverflowError):
                 continue
             
             # Get probability (price)
-            probability = market.get('probability', 0.5)
-            yes_price = probability
-            no_price = 1.0 - probability
+            yes_price = float(probs[i])
+            no_price = float(no_prices[i])
             
             # Manifold uses CPMM (Constant Product Market Maker) or DPM
             # The probability represents the current market price
@@ -82,20 +254,27 @@ class ManifoldPlatformClient(PlatformClient):
             # For buying NO, you'd pay around (1 - probability)
             # But actual execution prices depend on liquidity and slippage
             
-            normalized_events.append({
-                'id': market['id'],
-                'title': market.get('question', ''),
+            question = market.question
+            event = {
+                'id': market_id,
+                'title': question,
+                'title_lc': question.lower(),
                 'end_date': close_dt,
                 'markets': [{
-                    'id': market['id'],
-                    'question': market.get('question', ''),
+                    'id': market_id,
+                    'question': question,
                     'yes_price': yes_price,
                     'no_price': no_price
                 }],
                 'platform': 'manifold',
-                'raw_data': market
-            })
+                # Only the fields alert links are built from
+                'raw_data': {'slug': market.slug, 'creatorUsername': market.creatorUsername}
+            }
+            normalized_events.append(event)
+            if updated is not None:
+                cache[market_id], last_updated[market_id] = event, updated
         
+        self._cache, self._last_updated = cache, last_updated
         return normalized_events
     
     async def get_market_prices(self, event_id: str, market_id: str) -> Optional[Tuple[float, float]]:
@@ -105,17 +284,18 @@ class ManifoldPlatformClient(PlatformClient):
         Note: For Manifold, event_id and market_id are the same.
         """
         try:
-            response = self.session.get(
+            async with self._get_session().get(
                 f"{self.BASE_URL}/market/{market_id}",
-                timeout=30
-            )
-            response.raise_for_status()
-            market = response.json()
+                headers=self.headers,
+                timeout=REQUEST_TIMEOUT
+            ) as response:
+                response.raise_for_status()
+                market = _decode_market(await response.read())
             
-            if market.get('isResolved', False):
+            if market.isResolved:
                 return None
             
-            probability = market.get('probability', 0.5)
+            probability = market.probability
             yes_price = probability
             no_price = 1.0 - probability
             
@@ -1,17 +1,232 @@
 import os
-import json
-import requests
+import time
+import random
+import asyncio
+import aiohttp
+from yarl import URL
+import numpy as np
+import orjson
 from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Optional, Tuple
+from sortedcontainers import SortedDict
 from py_clob_client.client import ClobClient
 from py_clob_client.clob_types import ApiCreds
 from .base import PlatformClient
 
+# Order book fetch attempts before giving up on a token
+MAX_BOOK_ATTEMPTS = 3
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30)
+# Open-events query; filled in with the limit once per limit and reused as a parsed URL
+GAMMA_EVENTS_URL_TEMPLATE = "https://gamma-api.polymarket.com/events?closed=false&limit={}"
+# Seconds a normalized event list is reused for repeated get_events calls
+EVENTS_CACHE_TTL = 10.0
+# Seconds a token's order book price is reused
+PRICE_CACHE_TTL = 2.0
+WS_MARKET_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
+# The market channel drops connections that stay silent for longer than this
+WS_PING_INTERVAL = 10.0
+# No message (not even a PONG) for this long means the stream has stalled; reconnect
+WS_RECEIVE_TIMEOUT = 2 * WS_PING_INTERVAL
+# Books without a snapshot or delta for this long are priced over REST instead
+BOOK_MAX_AGE = 30.0
+
+
+def _walk_asks(prices: np.ndarray, sizes: np.ndarray, amount_usd: float, best_price: float) -> float:
+    """
+    Average fill price for amount_usd over ask levels ordered from best to worst.
+    
+    Args:
+        prices: Level prices
+        sizes: Level sizes in shares
+        amount_usd: Order size in USD
+        best_price: Price returned when the book is too thin to fill the order
+        
+    Returns:
+        Weighted average price, or best_price if the levels can't fill amount_usd
+    """
+    # The fill level is the first whose cumulative notional reaches amount_usd
+    cum_usd = np.cumsum(prices * sizes)
+    idx = int(np.searchsorted(cum_usd, amount_usd))
+    
+    if idx < len(cum_usd):
+        filled_usd = float(cum_usd[idx - 1]) if idx else 0.0
+        shares = float(sizes[:idx].sum()) + (amount_usd - filled_usd) / float(prices[idx])
+        return amount_usd / shares
+    return best_price
+
+
+class PolymarketBookCache:
+    """
+    Local ask books for Polymarket tokens, kept current from the CLOB market WebSocket.
+    
+    Each subscribed token gets a price -> size SortedDict, replaced by 'book'
+    snapshots and patched by 'price_change' deltas, so reading a price is a
+    dict lookup instead of a REST round trip. Books are dropped while the stream
+    is down or stalled, and books not updated for BOOK_MAX_AGE are not served;
+    callers fall back to REST for those tokens.
+    """
+    
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        """
+        Initialize the book cache; the stream starts on the first set_tokens().
+        
+        Args:
+            session: Optional shared HTTP session; the caller keeps ownership and closes it
+        """
+        self.session = session
+        self._owns_session = session is None
+        # token_id -> ask levels (price -> size), lowest price first
+        self._books: Dict[str, SortedDict] = {}
+        # token_id -> monotonic time of the book's last snapshot or delta
+        self._updated: Dict[str, float] = {}
+        # Insertion-ordered set of token ids currently subscribed
+        self._tokens: Dict[str, None] = {}
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the HTTP session, creating it on first use."""
+        if self._owns_session and (self.session is None or self.session.closed):
+            self.session = aiohttp.ClientSession()
+        return self.session
+    
+    def get_asks(self, token_id: str) -> Optional[SortedDict]:
+        """Ask levels for a token, or None if it has no snapshot or hasn't been updated for BOOK_MAX_AGE."""
+        updated = self._updated.get(token_id)
+        if updated is None or time.monotonic() - updated > BOOK_MAX_AGE:
+            return None
+        return self._books.get(token_id)
+    
+    async def set_tokens(self, token_ids):
+        """
+        Stream books for exactly token_ids: subscribe the new ones, and
+        unsubscribe and drop the books of tokens no longer listed.
+        
+        Args:
+            token_ids: Iterable of CLOB token IDs
+        """
+        tokens = dict.fromkeys(token_ids)
+        new = [t for t in tokens if t not in self._tokens]
+        gone = [t for t in self._tokens if t not in tokens]
+        if not new and not gone:
+            return
+        self._tokens = tokens
+        for token_id in gone:
+            self._books.pop(token_id, None)
+            self._updated.pop(token_id, None)
+        
+        if self._task is None or self._task.done():
+            if tokens:
+                self._task = asyncio.create_task(self._run())
+            return
+        if self._ws is not None and not self._ws.closed:
+            try:
+                if gone:
+                    await self._ws.send_str(orjson.dumps({'assets_ids': gone, 'operation': 'unsubscribe'}).decode())
+                if new:
+                    await self._ws.send_str(orjson.dumps({'assets_ids': new, 'operation': 'subscribe'}).decode())
+            except Exception:
+                # The next reconnect subscribes to the current token set
+                pass
+    
+    async def close(self):
+        """Stop the stream and close the HTTP session if it is owned."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._owns_session and self.session is not None and not self.session.closed:
+            await self.session.close()
+    
+    async def _keepalive(self, ws: aiohttp.ClientWebSocketResponse):
+        """Send the text PING the market channel expects."""
+        try:
+            while not ws.closed:
+                await asyncio.sleep(WS_PING_INTERVAL)
+                await ws.send_str("PING")
+        except (ConnectionError, RuntimeError, aiohttp.ClientError):
+            # Socket closed under us; the reader loop sees it and reconnects
+            pass
+    
+    async def _run(self):
+        """Keep the market channel connected, reconnecting with backoff."""
+        backoff = 1
+        while True:
+            try:
+                # receive_timeout turns a half-open or silent socket into an error,
+                # so the books are cleared instead of served stale
+                async with self._get_session().ws_connect(WS_MARKET_URL, receive_timeout=WS_RECEIVE_TIMEOUT) as ws:
+                    self._ws = ws
+                    await ws.send_str(orjson.dumps({'assets_ids': list(self._tokens), 'type': 'market'}).decode())
+                    keepalive = asyncio.create_task(self._keepalive(ws))
+                    backoff = 1
+                    try:
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                if msg.data != "PONG":
+                                    self._apply(orjson.loads(msg.data))
+                            elif msg.type == aiohttp.WSMsgType.ERROR:
+                                break
+                    finally:
+                        keepalive.cancel()
+                        await asyncio.gather(keepalive, return_exceptions=True)
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                print(f"Polymarket book stream silent for {WS_RECEIVE_TIMEOUT:.0f}s, reconnecting")
+            except Exception as e:
+                print(f"Polymarket book stream error: {e}")
+            finally:
+                self._ws = None
+                # Without the stream the books go stale; readers use REST until fresh snapshots arrive
+                self._books.clear()
+                self._updated.clear()
+            
+            await asyncio.sleep(backoff + random.random())
+            backoff = min(backoff * 2, 60)
+    
+    def _apply(self, payload):
+        """Apply one market channel message (or a list of them) to the local books."""
+        for msg in payload if isinstance(payload, list) else (payload,):
+            event_type = msg.get('event_type')
+            if event_type == 'book':
+                asks = SortedDict()
+                for level in msg.get('asks') or msg.get('sells') or ():
+                    size = float(level['size'])
+                    if size > 0:
+                        asks[float(level['price'])] = size
+                # Snapshots can still arrive for a token just unsubscribed
+                if msg['asset_id'] in self._tokens:
+                    self._books[msg['asset_id']] = asks
+                    self._updated[msg['asset_id']] = time.monotonic()
+            elif event_type == 'price_change':
+                # Newer messages batch changes for several assets; older ones carry a single asset_id
+                for change in msg.get('price_changes') or msg.get('changes') or ():
+                    if change.get('side') != 'SELL':
+                        continue
+                    token_id = change.get('asset_id') or msg.get('asset_id')
+                    asks = self._books.get(token_id)
+                    if asks is None:
+                        # No snapshot yet; the book message will bring this level
+                        continue
+                    price, size = float(change['price']), float(change['size'])
+                    if size > 0:
+                        asks[price] = size
+                    else:
+                        asks.pop(price, None)
+                    self._updated[token_id] = time.monotonic()
+            # tick_size_change and last_trade_price don't move ask levels
+
 
 class PolymarketClient(PlatformClient):
     """Client for Polymarket prediction markets."""
     
-    def __init__(self, private_key: str, api_key: str, api_secret: str, api_passphrase: str):
+    def __init__(self, private_key: str, api_key: str, api_secret: str, api_passphrase: str,
+                 session: Optional[aiohttp.ClientSession] = None,
+                 book_cache: Optional[PolymarketBookCache] = None):
         """
         Initialize Polymarket client.
         
@@ -20,6 +235,10 @@ class PolymarketClient(PlatformClient):
             api_key: CLOB API key
             api_secret: CLOB API secret
             api_passphrase: CLOB API passphrase
+            session: Optional shared HTTP session for Gamma requests; the caller keeps
+                     ownership and closes it
+            book_cache: Optional streamed order books to price from before falling back
+                        to REST; the caller keeps ownership and closes it
         """
         creds = ApiCreds(
             api_key=api_key,
@@ -33,6 +252,44 @@ class PolymarketClient(PlatformClient):
             creds=creds
         )
         self.order_size_usd = 1.0
+        # Caps concurrent CLOB requests so a full scan stays under the rate limit
+        self._sem = asyncio.Semaphore(int(os.getenv("PM_CONCURRENCY", "16")))
+        # Created lazily when not injected: an aiohttp session must be opened
+        # inside the running event loop
+        self.session: Optional[aiohttp.ClientSession] = session
+        self._owns_session = session is None
+        self.book_cache = book_cache
+        # limit -> (monotonic fetch time, cutoff used, normalized events, market index)
+        self._events_cache: Dict[int, Tuple[float, datetime, List[Dict], Dict]] = {}
+        # limit -> prebuilt Gamma events URL, so aiohttp doesn't reparse it every scan
+        self._gamma_urls: Dict[int, URL] = {}
+        # limit -> (ETag, Gamma events payload) of the last response
+        self._etags: Dict[int, Tuple[str, List[Dict]]] = {}
+        # token_id -> (expiry on the monotonic clock, price)
+        self._price_cache: Dict[str, Tuple[float, Optional[float]]] = {}
+        # (event_id, market_id) -> (yes_price, no_price), refreshed by get_events()
+        self._market_index: Dict[Tuple[str, str], Tuple[float, float]] = {}
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the HTTP session, creating a keep-alive one on first use."""
+        if self._owns_session and (self.session is None or self.session.closed):
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=64, keepalive_timeout=75, ttl_dns_cache=300),
+                timeout=REQUEST_TIMEOUT
+            )
+        return self.session
+    
+    async def close(self):
+        """Close the HTTP session, unless it was shared in by the caller."""
+        if self._owns_session and self.session is not None and not self.session.closed:
+            await self.session.close()
+    
+    def _gamma_url(self, limit: int) -> URL:
+        """Gamma open-events URL for limit, built once per limit."""
+        url = self._gamma_urls.get(limit)
+        if url is None:
+            url = self._gamma_urls[limit] = URL(GAMMA_EVENTS_URL_TEMPLATE.format(int(limit)), encoded=True)
+        return url
     
     def _parse_clob_token_ids(self, raw):
         """Parse clobTokenIds from Gamma API (can be JSON string or list)."""
@@ -42,56 +299,139 @@ class PolymarketClient(PlatformClient):
             return raw if len(raw) >= 2 else None
         if isinstance(raw, str):
             try:
-                out = json.loads(raw)
+                out = orjson.loads(raw)
                 return out if isinstance(out, list) and len(out) >= 2 else None
-            except (json.JSONDecodeError, TypeError):
+            except (orjson.JSONDecodeError, TypeError):
                 return None
         return None
     
-    def _get_best_ask(self, token_id: str) -> Optional[float]:
+    async def _get_order_book(self, token_id: str):
+        """
+        Fetch an order book, retrying rate limits and transient failures with backoff.
+        
+        Args:
+            token_id: CLOB token ID
+            
+        Returns:
+            The py-clob-client order book; raises if every attempt failed
+        """
+        for attempt in range(MAX_BOOK_ATTEMPTS):
+            try:
+                async with self._sem:
+                    # py-clob-client is blocking; keep it off the event loop
+                    return await asyncio.to_thread(self.client.get_order_book, token_id)
+            except Exception as e:
+                # Request errors surface with no status code; 4xx other than 429 won't improve
+                status = getattr(e, "status_code", None)
+                if attempt == MAX_BOOK_ATTEMPTS - 1 or not (status is None or status == 429 or status >= 500):
+                    raise
+            await asyncio.sleep(2 ** attempt + random.random())
+    
+    async def _get_best_ask(self, token_id: str) -> Optional[float]:
         """Best ask price only; returns None if no book or no asks."""
         try:
-            book = self.client.get_order_book(token_id)
+            book = await self._get_order_book(token_id)
             if not (hasattr(book, "asks") and book.asks):
                 return None
-            return float(book.asks[0].price)
+            # The CLOB lists asks highest price first
+            return min(float(a.price) for a in book.asks)
         except Exception:
             return None
     
     async def _get_impact_price(self, token_id: str, amount_usd: float) -> Optional[float]:
         """Weighted average price for amount_usd; falls back to best ask if book too thin."""
         try:
-            book = self.client.get_order_book(token_id)
+            book = await self._get_order_book(token_id)
             if not (hasattr(book, "asks") and book.asks):
                 return None
-
-            filled_usd, shares = 0, 0
-            for ask in book.asks:
-                p, s = float(ask.price), float(ask.size)
-                avail = p * s
-                if filled_usd + avail >= amount_usd:
-                    rem = amount_usd - filled_usd
-                    shares += rem / p
-                    filled_usd = amount_usd
-                    break
-                shares += s
-                filled_usd += avail
-
-            if filled_usd >= amount_usd:
-                return amount_usd / shares
-            # Book too thin: return best ask as fallback
-            return float(book.asks[0].price)
+            
+            # The CLOB lists asks highest price first; walk them cheapest first,
+            # as the streamed books are
+            asks = sorted(book.asks, key=lambda a: float(a.price))
+            
+            # Common case: the best level alone fills the order, so its price is the average
+            best = asks[0]
+            best_price = float(best.price)
+            if amount_usd > 0 and best_price * float(best.size) >= amount_usd:
+                return best_price
+            
+            n = len(asks)
+            prices = np.fromiter((float(a.price) for a in asks), dtype=np.float64, count=n)
+            sizes = np.fromiter((float(a.size) for a in asks), dtype=np.float64, count=n)
+            return _walk_asks(prices, sizes, amount_usd, best_price)
         except Exception:
             return None
     
-    async def get_events(self, limit: int = 50, max_resolution_days: int = 3) -> List[Dict]:
+    def _price_from_asks(self, asks: SortedDict, amount_usd: float) -> Optional[float]:
+        """Impact price for amount_usd from a streamed book; None if it has no asks."""
+        if not asks:
+            return None
+        best_price, best_size = asks.peekitem(0)
+        if amount_usd > 0 and best_price * best_size >= amount_usd:
+            return best_price
+        try:
+            n = len(asks)
+            prices = np.fromiter(asks.keys(), dtype=np.float64, count=n)
+            sizes = np.fromiter(asks.values(), dtype=np.float64, count=n)
+            return _walk_asks(prices, sizes, amount_usd, best_price)
+        except ZeroDivisionError:
+            return None
+    
+    async def _get_token_price(self, token_id: str) -> Optional[float]:
+        """Impact price for the configured order size, or the best ask if that fails."""
+        # A live streamed book needs no cache or fetch; get_asks withholds stale ones
+        asks = self.book_cache.get_asks(token_id) if self.book_cache is not None else None
+        if asks is not None:
+            return self._price_from_asks(asks, self.order_size_usd)
+        
+        cached = self._price_cache.get(token_id)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        
+        price = await self._get_impact_price(token_id, self.order_size_usd)
+        if price is None:
+            price = await self._get_best_ask(token_id)
+        self._price_cache[token_id] = (time.monotonic() + PRICE_CACHE_TTL, price)
+        return price
+    
+    async def get_events(self, limit: int = 50, max_resolution_days: int = 3,
+                         cutoff_time: Optional[datetime] = None) -> List[Dict]:
         """Fetch active events from Polymarket."""
-        cutoff_time = datetime.now(timezone.utc) + timedelta(days=max_resolution_days)
+        if cutoff_time is None:
+            cutoff_time = datetime.now(timezone.utc) + timedelta(days=max_resolution_days)
         
-        response = requests.get(f"https://gamma-api.polymarket.com/events?closed=false&limit={limit}")
-        events = response.json()
+        # A recent list built with (about) the same or a later cutoff already holds every
+        # event this call wants; the cutoff itself creeps forward by up to the TTL
+        cached = self._events_cache.get(limit)
+        if (cached is not None and time.monotonic() - cached[0] < EVENTS_CACHE_TTL
+                and cutoff_time <= cached[1] + timedelta(seconds=EVENTS_CACHE_TTL)):
+            self._market_index = cached[3]
+            return [e for e in cached[2] if e['end_date'] <= cutoff_time]
         
-        normalized_events = []
+        etag, cached_events = self._etags.get(limit, (None, None))
+        fetched_at = time.monotonic()
+        async with self._get_session().get(
+            self._gamma_url(limit),
+            # Conditional GET: a 304 means the previous payload is still current
+            headers={'If-None-Match': etag} if etag else None,
+            timeout=REQUEST_TIMEOUT
+        ) as response:
+            if response.status == 304 and cached_events is not None:
+                events = cached_events
+            else:
+                response.raise_for_status()
+                events = orjson.loads(await response.read())
+                if response.headers.get('ETag'):
+                    self._etags[limit] = (response.headers['ETag'], events)
+        
+        # Drop expired book prices before this scan refills the cache
+        now = time.monotonic()
+        self._price_cache = {k: v for k, v in self._price_cache.items() if v[0] > now}
+        
+        # First pass: filter events and collect the order books to price
+        candidates = []
+        # Insertion-ordered set: a token listed under several events is fetched once
+        token_ids = {}
         
         for event in events:
             end_str = event.get("endDate")
@@ -110,44 +450,50 @@ class PolymarketClient(PlatformClient):
             if not markets:
                 continue
             
-            # Filter tradeable markets
-            tradeable = [
-                m for m in markets
-                if m.get("enableOrderBook") is True
-                and m.get("closed") is not True
-                and m.get("acceptingOrders") is not False
-            ]
-            
-            if not tradeable:
-                continue
-            
-            # Get prices for each market
-            normalized_markets = []
-            for m in tradeable:
+            # Filter tradeable markets, reading each field needed later exactly once
+            tradeable = []
+            for m in markets:
+                if not (m.get("enableOrderBook") is True
+                        and m.get("closed") is not True
+                        and m.get("acceptingOrders") is not False):
+                    continue
                 t_ids = self._parse_clob_token_ids(m.get("clobTokenIds"))
                 if not t_ids:
                     continue
-                
                 yes_token, no_token = t_ids[0], t_ids[1]
-                
-                # Get prices
-                yes_price = await self._get_impact_price(yes_token, self.order_size_usd)
-                if yes_price is None:
-                    yes_price = self._get_best_ask(yes_token)
-                
-                no_price = await self._get_impact_price(no_token, self.order_size_usd)
-                if no_price is None:
-                    no_price = self._get_best_ask(no_token)
-                    if no_price is None and yes_price is not None:
-                        # Infer NO price from YES price
-                        no_price = 1.0 - yes_price
+                tradeable.append((m.get('id') or m.get('slug', ''), m.get('question', ''), yes_token, no_token))
+                token_ids[yes_token] = None
+                token_ids[no_token] = None
+            
+            if tradeable:
+                candidates.append((event, end_dt, tradeable))
+        
+        # Stream exactly these books from now on (tokens that left the listing are
+        # dropped); until their snapshots arrive they are fetched over REST
+        if self.book_cache is not None:
+            await self.book_cache.set_tokens(token_ids)
+        
+        # Fetch every distinct YES/NO book concurrently instead of one round trip at a time
+        prices = dict(zip(token_ids, await asyncio.gather(*map(self._get_token_price, token_ids))))
+        
+        # Second pass: assemble events in their original order
+        normalized_events = []
+        market_index = {}
+        
+        for event, end_dt, tradeable in candidates:
+            normalized_markets = []
+            for market_id, question, yes_token, no_token in tradeable:
+                yes_price, no_price = prices[yes_token], prices[no_token]
+                if no_price is None and yes_price is not None:
+                    # Infer NO price from YES price
+                    no_price = 1.0 - yes_price
                 
                 if yes_price is None:
                     continue
                 
                 normalized_markets.append({
-                    'id': m.get('id') or m.get('slug', ''),
-                    'question': m.get('question', ''),
+                    'id': market_id,
+                    'question': question,
                     'yes_price': yes_price,
                     'no_price': no_price
                 })
@@ -155,32 +501,40 @@ class PolymarketClient(PlatformClient):
             if not normalized_markets:
                 continue
             
+            event_id = event.get('id') or event.get('slug', '')
+            for market in normalized_markets:
+                if market['yes_price'] is not None and market['no_price'] is not None:
+                    market_index.setdefault((event_id, market['id']), (market['yes_price'], market['no_price']))
+            
+            title = event.get('title', '')
             normalized_events.append({
-                'id': event.get('id') or event.get('slug', ''),
-                'title': event.get('title', ''),
+                'id': event_id,
+                'title': title,
+                'title_lc': title.lower(),
                 'end_date': end_dt,
                 'markets': normalized_markets,
                 'platform': 'polymarket',
-                'raw_data': event
+                # Only the field alert links are built from
+                'raw_data': {'slug': event.get('slug', '')}
             })
         
+        self._market_index = market_index
+        self._events_cache[limit] = (fetched_at, cutoff_time, normalized_events, market_index)
         return normalized_events
     
     async def get_market_prices(self, event_id: str, market_id: str) -> Optional[Tuple[float, float]]:
         """
         Get YES and NO prices for a specific market.
         
-        Note: This requires fetching the event first to find the market.
+        Served from the index built by the last get_events() call; on a miss
+        the event list is refetched (or reused, if still fresh) to find the market.
         For efficiency, prefer using get_events() which includes prices.
         """
-        events = await self.get_events(limit=200)
-        for event in events:
-            if event['id'] == event_id:
-                for market in event['markets']:
-                    if market['id'] == market_id:
-                        if market['yes_price'] is not None and market['no_price'] is not None:
-                            return (market['yes_price'], market['no_price'])
-        return None
+        prices = self._market_index.get((event_id, market_id))
+        if prices is None:
+            await self.get_events(limit=200)
+            prices = self._market_index.get((event_id, market_id))
+        return prices
     
     def get_fee_rate(self) -> float:
         """Polymarket fee rate is 0.2%."""
@@ -1,11 +1,38 @@
 import os
 import asyncio
+import aiohttp
 from dotenv import load_dotenv
 from py_clob_client.client import ClobClient
 from py_clob_client.clob_types import ApiCreds
 
 load_dotenv()
 
+CLOB_HOST = "https://clob.polymarket.com"
+# Max concurrent get_price calls when the bulk endpoint is unavailable
+PRICE_CONCURRENCY = 16
+
+
+async def fetch_prices_bulk(session, token_ids):
+    """Best BUY price for every token in one POST to the CLOB /prices endpoint."""
+    body = [{"token_id": t, "side": "BUY"} for t in token_ids]
+    async with session.post(f"{CLOB_HOST}/prices", json=body) as resp:
+        resp.raise_for_status()
+        data = await resp.json()
+    return {t: float(data[t]["BUY"]) for t in token_ids}
+
+
+async def fetch_prices_parallel(client, token_ids):
+    """Best BUY price for every token via concurrent get_price calls."""
+    sem = asyncio.Semaphore(PRICE_CONCURRENCY)
+
+    async def get_price(token_id):
+        async with sem:
+            return float((await asyncio.to_thread(client.get_price, token_id, side="BUY"))['price'])
+
+    prices = await asyncio.gather(*map(get_price, token_ids))
+    return dict(zip(token_ids, prices))
+
+
 async def main():
     # 1. Initialize Client with your L2 Creds
     creds = ApiCreds(
@@ -13,25 +40,31 @@ async def main():
         api_secret=os.getenv("CLOB_SECRET"),
         api_passphrase=os.getenv("CLOB_PASSPHRASE")
     )
-    client = ClobClient(host="https://clob.polymarket.com", key=os.getenv("POLYMARKET_PRIVATE_KEY"), chain_id=137, creds=creds)
+    client = ClobClient(host=CLOB_HOST, key=os.getenv("POLYMARKET_PRIVATE_KEY"), chain_id=137, creds=creds)
 
     print("🔎 Scanning Polymarket for arbitrage gaps...")
 
-    while True:
-        try:
-            # 2. Get active markets
-            markets = client.get_simplified_markets()
-            
-            for m in markets.get('data', []):
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                # 2. Get active markets
+                markets = await asyncio.to_thread(client.get_simplified_markets)
+                
                 # We only want binary (Yes/No) markets for now
-                if len(m.get('tokens', [])) == 2:
-                    yes_token = m['tokens'][0]['token_id']
-                    no_token = m['tokens'][1]['token_id']
-                    
-                    # 3. Get best 'Ask' (price to buy) for both
-                    # Using get_price is more reliable than get_order_book for quick scans
-                    yes_price = float(client.get_price(yes_token, side="BUY")['price'])
-                    no_price = float(client.get_price(no_token, side="BUY")['price'])
+                binary = [m for m in markets.get('data', []) if len(m.get('tokens', [])) == 2]
+                token_ids = list(dict.fromkeys(t['token_id'] for m in binary for t in m['tokens']))
+                
+                # 3. Get best 'Ask' (price to buy) for every token in one batch
+                # Using get_price is more reliable than get_order_book for quick scans
+                try:
+                    prices = await fetch_prices_bulk(session, token_ids) if token_ids else {}
+                except Exception as e:
+                    print(f"⚠️ Bulk price fetch failed ({e}), fetching individually")
+                    prices = await fetch_prices_parallel(client, token_ids)
+                
+                for m in binary:
+                    yes_price = prices[m['tokens'][0]['token_id']]
+                    no_price = prices[m['tokens'][1]['token_id']]
                     
                     total_cost = yes_price + no_price
                     
@@ -40,13 +73,13 @@ async def main():
                         print(f"💰 PROFIT ALERT: {m['question']}")
                         print(f"   Yes: ${yes_price} | No: ${no_price} | Total: ${total_cost}")
                         print(f"   Potential Profit: {round((1 - total_cost)*100, 2)}% per pair")
-            
-            print("...Waiting 30 seconds for next scan")
-            await asyncio.sleep(30) 
+                
+                print("...Waiting 30 seconds for next scan")
+                await asyncio.sleep(30) 
 
-        except Exception as e:
-            print(f"⚠️ Scan error: {e}")
-            await asyncio.sleep(5)
+            except Exception as e:
+                print(f"⚠️ Scan error: {e}")
+                await asyncio.sleep(5)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,13 +1,367 @@
 """
 Shared state writer for dashboard communication.
-Writes scan statistics to a JSON file that the dashboard can read.
+Appends each scan to a zstd-compressed JSONL history log and keeps running
+totals in a small summary JSON file; the dashboard reads the summary plus the
+tail of the log.
 """
-import json
+import os
+import time
+import queue
+import atexit
+import threading
+import orjson
+import zstandard
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
+# Summary (totals, best opportunity, last scan); rewritten atomically every scan
 STATS_FILE = Path(__file__).parent / "dashboard_stats.json"
+# Append-only scan history: JSON lines, each flushed batch compressed as its own zstd frame
+HISTORY_FILE = Path(__file__).parent / "dashboard_stats.jsonl.zst"
+# Scans returned as scan_history by get_stats() and kept by compaction
+MAX_SCAN_HISTORY = 100
+# Trim the history log down to MAX_SCAN_HISTORY lines every this many scans
+COMPACT_EVERY = 1000
+# zstd level for history frames
+ZSTD_LEVEL = 3
+# Pending scans are flushed to disk once this many accumulate or this long after the last flush
+FLUSH_EVERY_SCANS = 8
+FLUSH_INTERVAL_SECONDS = 5.0
+
+# fdatasync skips the inode timestamp update fsync also forces; not available on macOS/Windows
+_datasync = getattr(os, 'fdatasync', os.fsync)
+
+_CCTX = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+_DCTX = zstandard.ZstdDecompressor()
+
+# Scans handed over by write_scan_stats, drained by the writer thread
+_QUEUE: "queue.Queue[Tuple[Dict, Optional[Dict]]]" = queue.Queue()
+_WRITER: Optional[threading.Thread] = None
+# Guards the state below, shared by the writer thread and flush()
+_LOCK = threading.Lock()
+# Scans not yet written to the history log, and the summary they are already counted in
+_PENDING: List[Dict] = []
+_SUMMARY: Optional[Dict] = None
+_LAST_FLUSH = time.monotonic()
+# Whether this process has checked the history log for a torn tail
+_HISTORY_CHECKED = False
+
+
+# Per-scan records below are slotted dataclasses rather than dicts; orjson
+# serializes them natively, so they only become JSON objects when written
+@dataclass(slots=True, frozen=True)
+class OppSummary:
+    """One arbitrage opportunity as shown in the scan history."""
+    title: str
+    direction: str
+    profit_pct: float
+    profit: float
+    pm_yes: float
+    pm_no: float
+    manifold_yes: float
+    manifold_no: float
+
+
+@dataclass(slots=True, frozen=True)
+class EventSample:
+    """A sample event from one platform."""
+    title: str
+    end_date: Optional[str]
+    markets_count: int
+
+
+@dataclass(slots=True, frozen=True)
+class MatchedDetail:
+    """A matched Polymarket/Manifold event pair."""
+    pm_title: str
+    manifold_title: str
+    pm_end_date: Optional[str]
+    manifold_end_date: Optional[str]
+
+
+def _event_sample(e: Dict) -> EventSample:
+    """Display summary of a normalized event."""
+    end_date = e.get('end_date')
+    return EventSample(
+        title=e.get('title', '')[:60],
+        end_date=end_date.isoformat() if end_date else None,
+        markets_count=len(e.get('markets', []))
+    )
+
+
+def _write_atomic(path: Path, data: bytes):
+    """Write data to path via a synced temp file and rename, so readers never see a partial file."""
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        _datasync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _decode_frames(data) -> Tuple[bytes, int]:
+    """
+    Decompress concatenated zstd history frames.
+    
+    Args:
+        data: Bytes (or memoryview) starting at a frame boundary
+        
+    Returns:
+        (JSONL bytes of the complete frames, number of input bytes they span);
+        decoding stops at a torn or corrupt frame
+    """
+    view = memoryview(data)
+    out = []
+    pos = 0
+    while pos < len(view):
+        dobj = _DCTX.decompressobj()
+        try:
+            chunk = dobj.decompress(view[pos:])
+        except zstandard.ZstdError:
+            break
+        if not dobj.eof:
+            # Interrupted append
+            break
+        out.append(chunk)
+        pos = len(view) - len(dobj.unused_data)
+    return b''.join(out), pos
+
+
+def _read_history(summary: Optional[Dict], n: int) -> bytes:
+    """
+    Decompress enough of the history log to hold its last n scans.
+    
+    Args:
+        summary: Summary whose history_frames locate the recent frames, or None
+        n: Number of scans needed
+        
+    Returns:
+        JSONL bytes ending with the newest complete frame
+    """
+    frames = summary.get('history_frames') if summary else None
+    with open(HISTORY_FILE, 'rb') as f:
+        if frames:
+            # Start at the newest frame that still leaves n scans after it
+            start, count = frames[-1][0], 0
+            for offset, scans in reversed(frames):
+                start, count = offset, count + scans
+                if count >= n:
+                    break
+            f.seek(start)
+            data, end = _decode_frames(f.read(summary['history_size'] - start))
+            if end:
+                return data
+            # Offsets from a summary older than a compaction; read it all instead
+            f.seek(0)
+        return _decode_frames(f.read())[0]
+
+
+def _read_history_tail(n: int, summary: Optional[Dict] = None) -> List[Dict]:
+    """
+    Read the last n scans from the history log.
+    
+    Args:
+        n: Number of scans to return
+        summary: Summary locating the recent frames; without it the whole log is read
+        
+    Returns:
+        Up to n scan records, oldest first
+    """
+    if not HISTORY_FILE.exists():
+        return []
+    data = _read_history(summary, n)
+    
+    records = []
+    for line in data.split(b'\n')[-(n + 1):]:
+        if not line.strip():
+            continue
+        try:
+            records.append(orjson.loads(line))
+        except orjson.JSONDecodeError:
+            # A torn final line from an interrupted append
+            continue
+    return records[-n:]
+
+
+def _repair_history():
+    """
+    Cut the history log back to the frames the summary accounts for.
+    
+    A crash mid-append leaves a torn frame at the end of the log; appending
+    after it would make every later frame unreadable, so it is dropped before
+    this process writes its first frame.
+    """
+    size = HISTORY_FILE.stat().st_size if HISTORY_FILE.exists() else 0
+    end = _SUMMARY.get('history_size')
+    if _SUMMARY.get('history_frames') and end is not None and end <= size:
+        if size > end:
+            os.truncate(HISTORY_FILE, end)
+        return
+    
+    # Summary without frame offsets (e.g. just migrated from inline scan_history),
+    # or out of step with the log: find the last complete frame
+    data, end = _decode_frames(HISTORY_FILE.read_bytes()) if size else (b'', 0)
+    if end < size:
+        os.truncate(HISTORY_FILE, end)
+    _SUMMARY['history_frames'] = [[0, data.count(b'\n')]] if end else []
+    _SUMMARY['history_size'] = end
+
+
+def _load_summary() -> Dict:
+    """Read the summary file, migrating inline scan_history into the log."""
+    if not STATS_FILE.exists():
+        return {
+            'total_scans': 0,
+            'total_opportunities': 0,
+            'total_alerts': 0,
+            'best_opportunity': None,
+            'last_scan': None,
+            'agg': {'n': 0, 'sum_pm': 0, 'sum_mf': 0, 'sum_matched': 0}
+        }
+    
+    with open(STATS_FILE, 'rb') as f:
+        stats = orjson.loads(f.read())
+    
+    # Files written before the history log existed carry scan_history inline;
+    # move it into the log once
+    legacy_history = stats.pop('scan_history', None) or []
+    if legacy_history and not HISTORY_FILE.exists():
+        _write_atomic(HISTORY_FILE, _CCTX.compress(b''.join(orjson.dumps(r) + b'\n' for r in legacy_history)))
+    stats['total_scans'] = max(stats.get('total_scans', 0), len(legacy_history))
+    
+    # Running aggregates so the dashboard averages are O(1) to read;
+    # files written before these existed are seeded from their history
+    if not stats.get('agg'):
+        stats['agg'] = {
+            'n': len(legacy_history),
+            'sum_pm': sum(s.get('pm_events', 0) for s in legacy_history),
+            'sum_mf': sum(s.get('manifold_events', 0) for s in legacy_history),
+            'sum_matched': sum(s.get('matched', 0) for s in legacy_history)
+        }
+    return stats
+
+
+def _flush():
+    """Write pending scans to the history log as one zstd frame + data sync, then the summary."""
+    global _LAST_FLUSH, _HISTORY_CHECKED
+    _LAST_FLUSH = time.monotonic()
+    if not _PENDING:
+        return
+    
+    if not _HISTORY_CHECKED:
+        _repair_history()
+        _HISTORY_CHECKED = True
+    
+    scans_before = _SUMMARY['total_scans'] - len(_PENDING)
+    data = _CCTX.compress(b''.join(orjson.dumps(r, option=orjson.OPT_SERIALIZE_NUMPY) + b'\n' for r in _PENDING))
+    # Unbuffered O_APPEND fd: the whole batch goes out in a single write syscall
+    fd = os.open(HISTORY_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        offset = os.fstat(fd).st_size
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        _datasync(fd)
+    finally:
+        os.close(fd)
+    
+    # Frame offsets let readers decompress only the tail of the log; keep just
+    # enough frames to cover MAX_SCAN_HISTORY scans
+    frames = _SUMMARY['history_frames']
+    frames.append([offset, len(_PENDING)])
+    while len(frames) > 1 and sum(scans for _, scans in frames[1:]) >= MAX_SCAN_HISTORY:
+        frames.pop(0)
+    _SUMMARY['history_size'] = offset + len(data)
+    _PENDING.clear()
+    
+    if scans_before // COMPACT_EVERY != _SUMMARY['total_scans'] // COMPACT_EVERY:
+        _compact_history()
+    
+    # Write the summary after the log so it never counts a scan the log lacks
+    _write_atomic(STATS_FILE, orjson.dumps(_SUMMARY, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+
+
+def _record(current_scan: Dict, best: Optional[Dict]):
+    """
+    Count a scan in the summary and queue it for the history log.
+    
+    Args:
+        current_scan: Scan record as written to the history log
+        best: Best opportunity of the scan in summary form, or None
+    """
+    global _SUMMARY
+    # The summary is read once and then kept current in memory
+    if _SUMMARY is None:
+        _SUMMARY = _load_summary()
+    stats = _SUMMARY
+    
+    agg = stats['agg']
+    stats['agg'] = {
+        'n': agg['n'] + 1,
+        'sum_pm': agg['sum_pm'] + current_scan['pm_events'],
+        'sum_mf': agg['sum_mf'] + current_scan['manifold_events'],
+        'sum_matched': agg['sum_matched'] + current_scan['matched']
+    }
+    
+    # Queue this scan for the history log: appended, never rewritten
+    _PENDING.append(current_scan)
+    
+    # Update stats
+    stats['total_scans'] += 1
+    stats['total_opportunities'] += current_scan['opportunities_count']
+    stats['total_alerts'] += current_scan['alerts_sent']
+    stats['last_scan'] = current_scan
+    
+    # Track best opportunity
+    if best is not None:
+        if not stats['best_opportunity'] or best['profit_pct'] > stats['best_opportunity'].get('profit_pct', 0):
+            stats['best_opportunity'] = best
+
+
+def _writer_loop():
+    """Drain queued scans and flush them in batches; wakes every second for the time-based flush."""
+    while True:
+        try:
+            item = _QUEUE.get(timeout=1.0)
+        except queue.Empty:
+            item = None
+        try:
+            with _LOCK:
+                if item is not None:
+                    _record(*item)
+                if _PENDING and (len(_PENDING) >= FLUSH_EVERY_SCANS
+                                 or time.monotonic() - _LAST_FLUSH > FLUSH_INTERVAL_SECONDS):
+                    _flush()
+        except Exception as e:
+            print(f"Error writing stats: {e}")
+        finally:
+            if item is not None:
+                _QUEUE.task_done()
+
+
+def flush():
+    """Write every scan handed to write_scan_stats to disk now (also run automatically at exit)."""
+    if _WRITER is not None:
+        _QUEUE.join()
+    try:
+        with _LOCK:
+            _flush()
+    except Exception as e:
+        print(f"Error writing stats: {e}")
+
+
+atexit.register(flush)
+
+
+def _compact_history():
+    """Rewrite the history log keeping only the last MAX_SCAN_HISTORY scans."""
+    records = _read_history_tail(MAX_SCAN_HISTORY, _SUMMARY)
+    data = _CCTX.compress(b''.join(orjson.dumps(r) + b'\n' for r in records))
+    _write_atomic(HISTORY_FILE, data)
+    _SUMMARY['history_frames'] = [[0, len(records)]]
+    _SUMMARY['history_size'] = len(data)
 
 
 def write_scan_stats(
@@ -22,7 +376,11 @@ def write_scan_stats(
     matched_pairs: Optional[List[tuple]] = None
 ):
     """
-    Write scan statistics to shared JSON file for dashboard.
+    Record scan statistics for the dashboard.
+    
+    Only builds the scan record; a background writer thread updates the summary
+    and writes scans in batches of FLUSH_EVERY_SCANS, or sooner once
+    FLUSH_INTERVAL_SECONDS have passed since the last write.
     
     Args:
         pm_events_count: Number of Polymarket events fetched
@@ -35,21 +393,8 @@ def write_scan_stats(
         manifold_sample_events: Sample Manifold events (for display)
         matched_pairs: List of matched event pairs
     """
+    global _WRITER
     try:
-        # Read existing stats if file exists
-        if STATS_FILE.exists():
-            with open(STATS_FILE, 'r') as f:
-                stats = json.load(f)
-        else:
-            stats = {
-                'scan_history': [],
-                'total_scans': 0,
-                'total_opportunities': 0,
-                'total_alerts': 0,
-                'best_opportunity': None,
-                'last_scan': None
-            }
-        
         # Prepare current scan data
         current_scan = {
             'timestamp': datetime.now(timezone.utc).isoformat(),
@@ -59,89 +404,75 @@ def write_scan_stats(
             'opportunities_count': opportunities_count,
             'alerts_sent': alerts_sent,
             'opportunities': [
-                {
-                    'title': opp.get('pm_event', {}).get('title', '')[:60],
-                    'direction': opp.get('direction', ''),
-                    'profit_pct': opp.get('profit_pct', 0),
-                    'profit': opp.get('profit', 0),
-                    'pm_yes': opp.get('pm_price', 0),
-                    'pm_no': opp.get('pm_event', {}).get('markets', [{}])[0].get('no_price', 0),
-                    'manifold_yes': opp.get('kalshi_event', {}).get('markets', [{}])[0].get('yes_price', 0),
-                    'manifold_no': opp.get('kalshi_price', 0),
-                }
+                OppSummary(
+                    title=opp.get('pm_event', {}).get('title', '')[:60],
+                    direction=opp.get('direction', ''),
+                    profit_pct=opp.get('profit_pct', 0),
+                    profit=opp.get('profit', 0),
+                    pm_yes=opp.get('pm_price', 0),
+                    pm_no=opp.get('pm_event', {}).get('markets', [{}])[0].get('no_price', 0),
+                    manifold_yes=opp.get('kalshi_event', {}).get('markets', [{}])[0].get('yes_price', 0),
+                    manifold_no=opp.get('kalshi_price', 0),
+                )
                 for opp in opportunities
             ]
         }
         
         # Add sample events if provided
         if pm_sample_events:
-            current_scan['pm_sample'] = [
-                {
-                    'title': e.get('title', '')[:60],
-                    'end_date': e.get('end_date').isoformat() if e.get('end_date') else None,
-                    'markets_count': len(e.get('markets', []))
-                }
-                for e in pm_sample_events[:5]
-            ]
+            current_scan['pm_sample'] = [_event_sample(e) for e in pm_sample_events[:5]]
         
         if manifold_sample_events:
-            current_scan['manifold_sample'] = [
-                {
-                    'title': e.get('title', '')[:60],
-                    'end_date': e.get('end_date').isoformat() if e.get('end_date') else None,
-                    'markets_count': len(e.get('markets', []))
-                }
-                for e in manifold_sample_events[:5]
-            ]
+            current_scan['manifold_sample'] = [_event_sample(e) for e in manifold_sample_events[:5]]
         
         # Add matched pairs info if provided
         if matched_pairs:
             current_scan['matched_details'] = [
-                {
-                    'pm_title': pm.get('title', '')[:50],
-                    'manifold_title': mf.get('title', '')[:50],
-                    'pm_end_date': pm.get('end_date').isoformat() if pm.get('end_date') else None,
-                    'manifold_end_date': mf.get('end_date').isoformat() if mf.get('end_date') else None,
-                }
+                MatchedDetail(
+                    pm_title=pm.get('title', '')[:50],
+                    manifold_title=mf.get('title', '')[:50],
+                    pm_end_date=pm.get('end_date').isoformat() if pm.get('end_date') else None,
+                    manifold_end_date=mf.get('end_date').isoformat() if mf.get('end_date') else None,
+                )
                 for pm, mf in matched_pairs[:10]
             ]
         
-        # Update stats
-        stats['scan_history'].append(current_scan)
-        stats['total_scans'] = len(stats['scan_history'])
-        stats['total_opportunities'] += opportunities_count
-        stats['total_alerts'] += alerts_sent
-        stats['last_scan'] = current_scan
-        
-        # Keep only last 100 scans in history
-        if len(stats['scan_history']) > 100:
-            stats['scan_history'] = stats['scan_history'][-100:]
-        
-        # Track best opportunity
+        # Best opportunity of this scan, in the form kept by the summary
+        best = None
         if opportunities:
-            best = max(opportunities, key=lambda x: x.get('profit_pct', 0))
-            if not stats['best_opportunity'] or best.get('profit_pct', 0) > stats['best_opportunity'].get('profit_pct', 0):
-                stats['best_opportunity'] = {
-                    'title': best.get('pm_event', {}).get('title', '')[:60],
-                    'profit_pct': best.get('profit_pct', 0),
-                    'profit': best.get('profit', 0),
-                    'timestamp': current_scan['timestamp']
-                }
+            top = max(opportunities, key=lambda x: x.get('profit_pct', 0))
+            best = {
+                'title': top.get('pm_event', {}).get('title', '')[:60],
+                'profit_pct': top.get('profit_pct', 0),
+                'profit': top.get('profit', 0),
+                'timestamp': current_scan['timestamp']
+            }
         
-        # Write to file
-        with open(STATS_FILE, 'w') as f:
-            json.dump(stats, f, indent=2)
+        # Started on first use so importing this module (e.g. from the dashboard) stays thread-free
+        if _WRITER is None:
+            _WRITER = threading.Thread(target=_writer_loop, name="stats-writer", daemon=True)
+            _WRITER.start()
+        _QUEUE.put((current_scan, best))
             
     except Exception as e:
         print(f"Error writing stats: {e}")
 
 
 def get_stats() -> Optional[Dict]:
-    """Read current stats from file."""
+    """Read the current summary, with the last MAX_SCAN_HISTORY scans as scan_history."""
     try:
         if STATS_FILE.exists():
-            with open(STATS_FILE, 'r') as f:
-                return json.load(f)
+            try:
+                stats = orjson.loads(STATS_FILE.read_bytes())
+            except orjson.JSONDecodeError:
+                # os.replace isn't atomic on every filesystem (e.g. some network
+                # mounts); a half-written file is gone by the second read
+                time.sleep(0.05)
+                stats = orjson.loads(STATS_FILE.read_bytes())
+            # Summaries from before the history log still carry it inline
+            if 'scan_history' not in stats:
+                stats['scan_history'] = _read_history_tail(MAX_SCAN_HISTORY, stats)
+            return stats
     except Exception as e:
         print(f"Error reading stats: {e}")
     return None